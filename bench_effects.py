@@ -0,0 +1,294 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from PIL import Image, ImageChops, ImageEnhance, ImageFilter
+from commands import effects
+
+DEFAULT_SIZE = "1024x1024"
+DEFAULT_LOOP_SIZE = "128x128"
+
+BLEED_RADIUS = 2
+BLEED_STRENGTH = 0.6
+TEXTURE_STRENGTH = 0.35
+NOISE_AMOUNT = 8.0
+GRADE = {"lift": (0.02, 0.0, 0.04), "gamma": (1.1, 1.0, 0.95), "gain": (1.05, 1.0, 0.9), "saturation": 0.8}
+
+
+def parse_size(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height or width)
+
+
+def sample_image(size):
+    # photo-like noise under a soft alpha blob, roughly what a text layer over a template looks like
+    rgb = Image.merge("RGB", [Image.effect_noise(size, 60) for _ in range(3)])
+    alpha = Image.radial_gradient("L").resize(size).point(lambda v: 255 - v)
+    img = rgb.convert("RGBA")
+    img.putalpha(alpha)
+    return img
+
+
+def sample_texture():
+    return Image.effect_noise((256, 256), 30)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def grade_lut_list(lift, gamma, gain):
+    lut = []
+    for channel_lift, channel_gamma, channel_gain in zip(lift, gamma, gain):
+        for v in range(256):
+            x = v / 255
+            y = min(1.0, max(0.0, x * channel_gain + channel_lift * (1 - x))) ** (1 / channel_gamma)
+            lut.append(min(255, max(0, round(y * 255))))
+    return lut
+
+
+def rgba_pixels(img):
+    data = img.tobytes()
+    return list(zip(data[0::4], data[1::4], data[2::4], data[3::4]))
+
+
+def tile_texture(texture, size):
+    tiled = Image.new("L", size)
+    for y in range(0, size[1], texture.height):
+        for x in range(0, size[0], texture.width):
+            tiled.paste(texture, (x, y))
+    return tiled
+
+
+# PIL equivalents: built-in filters and point LUTs, as a style would write them today
+
+def pil_ink_bleed(img, texture):
+    spread = img.convert("RGBa").filter(ImageFilter.BoxBlur(BLEED_RADIUS)).convert("RGBA")
+    grain = Image.effect_noise(img.size, 64).point(lambda v: round(255 * (1 - 0.3 * v / 255)))
+    bled_alpha = ImageChops.multiply(spread.getchannel("A").point(lambda a: round(a * BLEED_STRENGTH)), grain)
+    alpha = img.getchannel("A")
+    spread.paste(img, mask=alpha.point(lambda a: 255 if a else 0))
+    spread.putalpha(ImageChops.lighter(alpha, bled_alpha))
+    return spread
+
+
+def pil_prepare_texture(texture, size):
+    factor = tile_texture(texture, size).point(
+        lambda v: round(255 * (1 - TEXTURE_STRENGTH + TEXTURE_STRENGTH * v / 255))
+    )
+    return factor.convert("RGB")
+
+
+def pil_paper_texture(img, factor):
+    alpha = img.getchannel("A")
+    out = ImageChops.multiply(img.convert("RGB"), factor).convert("RGBA")
+    out.putalpha(alpha)
+    return out
+
+
+def pil_noise(img, texture):
+    grain = Image.effect_noise(img.size, NOISE_AMOUNT).convert("RGB")
+    alpha = img.getchannel("A")
+    out = ImageChops.add(img.convert("RGB"), grain, offset=-128).convert("RGBA")
+    out.putalpha(alpha)
+    return out
+
+
+def pil_color_grade(img, texture):
+    alpha = img.getchannel("A")
+    out = img.convert("RGB").point(grade_lut_list(GRADE["lift"], GRADE["gamma"], GRADE["gain"]))
+    out = ImageEnhance.Color(out).enhance(GRADE["saturation"]).convert("RGBA")
+    out.putalpha(alpha)
+    return out
+
+
+# per-pixel Python loops, the way ad hoc effects inside styles tend to be written
+
+def loop_ink_bleed(img, texture):
+    width, height = img.size
+    pixels = rgba_pixels(img)
+    alpha = [p[3] for p in pixels]
+    out = []
+    r = BLEED_RADIUS
+    for y in range(height):
+        for x in range(width):
+            total = 0
+            for dy in range(-r, r + 1):
+                yy = min(height - 1, max(0, y + dy))
+                for dx in range(-r, r + 1):
+                    total += alpha[yy * width + min(width - 1, max(0, x + dx))]
+            spread = total / (2 * r + 1) ** 2 * BLEED_STRENGTH * (1 - 0.3 * random.random())
+            p = pixels[y * width + x]
+            out.append((p[0], p[1], p[2], min(255, round(max(p[3], spread)))))
+    result = Image.new("RGBA", img.size)
+    result.putdata(out)
+    return result
+
+
+def loop_paper_texture(img, texture):
+    tex = texture.load()
+    width, height = img.size
+    out = []
+    for i, (r, g, b, a) in enumerate(rgba_pixels(img)):
+        v = tex[(i % width) % texture.width, (i // width) % texture.height]
+        factor = 1 - TEXTURE_STRENGTH + TEXTURE_STRENGTH * v / 255
+        out.append((round(r * factor), round(g * factor), round(b * factor), a))
+    result = Image.new("RGBA", img.size)
+    result.putdata(out)
+    return result
+
+
+def loop_noise(img, texture):
+    out = []
+    for r, g, b, a in rgba_pixels(img):
+        n = random.gauss(0, NOISE_AMOUNT)
+        out.append((
+            min(255, max(0, round(r + n))), min(255, max(0, round(g + n))), min(255, max(0, round(b + n))), a
+        ))
+    result = Image.new("RGBA", img.size)
+    result.putdata(out)
+    return result
+
+
+def loop_color_grade(img, texture):
+    lut = grade_lut_list(GRADE["lift"], GRADE["gamma"], GRADE["gain"])
+    s = GRADE["saturation"]
+    out = []
+    for r, g, b, a in rgba_pixels(img):
+        r, g, b = lut[r], lut[256 + g], lut[512 + b]
+        luma = 0.299 * r + 0.587 * g + 0.114 * b
+        out.append((
+            min(255, max(0, round(luma + (r - luma) * s))),
+            min(255, max(0, round(luma + (g - luma) * s))),
+            min(255, max(0, round(luma + (b - luma) * s))),
+            a
+        ))
+    result = Image.new("RGBA", img.size)
+    result.putdata(out)
+    return result
+
+
+EFFECTS = {
+    "ink_bleed": {
+        "effects": lambda img, texture: effects.ink_bleed(img, radius=BLEED_RADIUS, strength=BLEED_STRENGTH),
+        "pil": pil_ink_bleed,
+        "loop": loop_ink_bleed,
+    },
+    "paper_texture": {
+        "effects": lambda img, factor: effects.paper_texture(img, factor),
+        "pil": pil_paper_texture,
+        "loop": loop_paper_texture,
+        # the texture factor depends only on the template, so both sides build it once outside the timing
+        "prepare": {
+            "effects": lambda texture, size: effects.prepare_texture(texture, size, TEXTURE_STRENGTH),
+            "pil": pil_prepare_texture,
+        },
+    },
+    "noise": {
+        "effects": lambda img, texture: effects.noise(img, NOISE_AMOUNT),
+        "pil": pil_noise,
+        "loop": loop_noise,
+    },
+    "color_grade": {
+        "effects": lambda img, texture: effects.color_grade(img, **GRADE),
+        "pil": pil_color_grade,
+        "loop": loop_color_grade,
+    },
+}
+
+
+def time_impl(func, img, texture, iterations):
+    func(img, texture)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(img, texture)
+        samples.append(time.perf_counter() - start)
+    megapixels = img.width * img.height / 1_000_000
+    return {
+        "size": f"{img.width}x{img.height}",
+        "p50_ms": percentile(samples, 0.5) * 1000,
+        "ms_per_megapixel": percentile(samples, 0.5) * 1000 / megapixels,
+    }
+
+
+def run(names, size, loop_size, iterations, loop_iterations, skip_loops):
+    img = sample_image(size)
+    small = sample_image(loop_size)
+    texture = sample_texture()
+
+    results = {}
+    for name in names:
+        impls = EFFECTS[name]
+        prepare = impls.get("prepare", {})
+        row = {
+            kind: time_impl(impls[kind], img, prepare[kind](texture, img.size) if kind in prepare else texture, iterations)
+            for kind in ("effects", "pil")
+        }
+        # Python loops are timed on a small image and compared per megapixel
+        if not skip_loops:
+            row["loop"] = time_impl(impls["loop"], small, texture, loop_iterations)
+        cost = row["effects"]["ms_per_megapixel"]
+        row["speedup_vs_pil"] = row["pil"]["ms_per_megapixel"] / cost
+        if "loop" in row:
+            row["speedup_vs_loop"] = row["loop"]["ms_per_megapixel"] / cost
+        results[name] = row
+        print_result(name, row)
+
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "size": f"{size[0]}x{size[1]}",
+            "loop_size": f"{loop_size[0]}x{loop_size[1]}",
+            "iterations": iterations,
+        },
+        "results": results,
+    }
+
+
+def print_result(name, row):
+    line = (
+        f"{name:14} effects {row['effects']['ms_per_megapixel']:9.1f}ms/MP  "
+        f"pil {row['pil']['ms_per_megapixel']:9.1f}ms/MP ({row['speedup_vs_pil']:5.1f}x)"
+    )
+    if "loop" in row:
+        line += f"  loop {row['loop']['ms_per_megapixel']:10.1f}ms/MP ({row['speedup_vs_loop']:6.1f}x)"
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark commands.effects against PIL and Python-loop versions.")
+    parser.add_argument("--effect", choices=sorted(EFFECTS), action="append", help="only benchmark this effect (repeatable)")
+    parser.add_argument("--size", default=DEFAULT_SIZE, help="image size for the effects and PIL versions, e.g. 1024x1024")
+    parser.add_argument("--loop-size", default=DEFAULT_LOOP_SIZE, help="image size for the Python loops")
+    parser.add_argument("--iterations", type=int, default=10, help="timed runs per effects/PIL implementation")
+    parser.add_argument("--loop-iterations", type=int, default=2, help="timed runs per Python loop")
+    parser.add_argument("--no-loops", action="store_true", help="skip the Python-loop baselines")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.effect or list(EFFECTS),
+        parse_size(args.size),
+        parse_size(args.loop_size),
+        args.iterations,
+        args.loop_iterations,
+        args.no_loops,
+    )
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
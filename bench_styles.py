@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image
+from commands import postprocess
+from commands.catalog import font_catalog, premstyle_catalog, style_catalog
+from commands.render import find_renderer
+from commands.styleregistry import style_registry
+
+BENCH_USER_ID = 0
+MAX_TEXT_LENGTH = 14
+
+TEXT_CORPUS = [
+    "a",
+    "Hi",
+    "esigns",
+    "fansign 2025",
+    "ABCDEFGHIJKLMN",
+    "mmmmmmmmmmmmmm",
+    "MiXeD CaSe",
+    "café ñandú",
+    "Привет мир",
+    "Ελληνικά",
+    "日本語テキスト",
+    "emoji 😀✨",
+    "12345678901234",
+]
+
+PACKAGES = {
+    "styles": ("commands.styles", style_catalog),
+    "premstyles": ("commands.premstyles", premstyle_catalog),
+}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def render_once(func, text, font):
+    # legacy styles save their PNG inside the call, so image-returning styles are encoded
+    # inside the timing too; otherwise moving a style to the new API would look like a speedup
+    result = func(BENCH_USER_ID, text, font)
+    if inspect.iscoroutine(result):
+        result = asyncio.run(result)
+    if isinstance(result, Image.Image):
+        data, _ = postprocess.encode(result)
+        return data
+    return result
+
+
+def output_size(result, keep_output):
+    if isinstance(result, bytes):
+        return len(result)
+    path = Path(result)
+    size = path.stat().st_size
+    if not keep_output:
+        path.unlink(missing_ok=True)
+    return size
+
+
+def bench_style(package, style, fonts, texts, iterations, keep_output):
+    module = style_registry.get(f"{package}.{style}")
+    func_name = find_renderer(module, style)
+    if func_name is None:
+        return {"error": f"missing generate_fansign_{style}"}
+    func = getattr(module, func_name)
+
+    latencies = []
+    sizes = []
+    errors = []
+
+    # first call pays for imports and template loads, keep it out of the numbers
+    try:
+        output_size(render_once(func, texts[0], fonts[0]), keep_output)
+    except Exception as e:
+        errors.append(f"warmup: {e}")
+
+    started = time.perf_counter()
+    for font in fonts:
+        for text in texts:
+            for _ in range(iterations):
+                start = time.perf_counter()
+                try:
+                    result = render_once(func, text, font)
+                except Exception as e:
+                    errors.append(f"{font!r} {text!r}: {e}")
+                    continue
+                latencies.append(time.perf_counter() - start)
+                sizes.append(output_size(result, keep_output))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "renders": len(latencies),
+        "p50_ms": percentile(latencies, 0.5) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+        "renders_per_sec": len(latencies) / elapsed if latencies and elapsed else None,
+        "peak_rss_kb": peak_rss_kb(),
+        "mean_output_bytes": statistics.mean(sizes) if sizes else None,
+        "errors": errors[:20],
+        "error_count": len(errors),
+    }
+
+
+def run(packages, style_filter, font_filter, iterations, keep_output, isolate):
+    fonts = [font for font in font_catalog.all() if not font_filter or font in font_filter]
+    texts = [text[:MAX_TEXT_LENGTH] for text in TEXT_CORPUS]
+    if not fonts:
+        raise SystemExit("no fonts found in fonts/")
+
+    jobs = []
+    for package_name in packages:
+        package, catalog = PACKAGES[package_name]
+        for style in catalog.all():
+            if style_filter and style not in style_filter:
+                continue
+            jobs.append((f"{package_name}/{style}", package, style))
+
+    results = {}
+    if isolate:
+        # one fresh process per style so peak RSS belongs to that style alone
+        with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as pool:
+            for key, package, style in jobs:
+                future = pool.submit(bench_style, package, style, fonts, texts, iterations, keep_output)
+                results[key] = future.result()
+                print_result(key, results[key])
+    else:
+        for key, package, style in jobs:
+            results[key] = bench_style(package, style, fonts, texts, iterations, keep_output)
+            print_result(key, results[key])
+
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "fonts": fonts,
+            "texts": texts,
+            "iterations": iterations,
+            "isolated": isolate,
+        },
+        "results": results,
+    }
+
+
+def print_result(key, result):
+    if "error" in result:
+        print(f"{key:40} ERROR {result['error']}")
+        return
+    if not result["renders"]:
+        print(f"{key:40} no successful renders ({result['error_count']} errors)")
+        return
+    print(
+        f"{key:40} p50 {result['p50_ms']:8.1f}ms  p95 {result['p95_ms']:8.1f}ms  "
+        f"{result['renders_per_sec']:7.1f}/s  rss {result['peak_rss_kb'] / 1024:7.1f}MiB  "
+        f"out {result['mean_output_bytes'] / 1024:8.1f}KiB  errors {result['error_count']}"
+    )
+
+
+def compare(baseline, current, threshold):
+    regressions = []
+    for key, result in current["results"].items():
+        before = baseline["results"].get(key)
+        if not before or "error" in result or "error" in before:
+            continue
+        for field, higher_is_worse in (
+            ("p50_ms", True), ("p95_ms", True), ("peak_rss_kb", True),
+            ("mean_output_bytes", True), ("renders_per_sec", False),
+        ):
+            old, new = before.get(field), result.get(field)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change if higher_is_worse else -change) > threshold:
+                regressions.append((key, field, old, new, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark fansign style modules without Discord.")
+    parser.add_argument("--package", choices=sorted(PACKAGES), action="append", help="limit to styles or premstyles")
+    parser.add_argument("--style", action="append", help="only benchmark this style (repeatable)")
+    parser.add_argument("--font", action="append", help="only use this font (repeatable)")
+    parser.add_argument("--iterations", type=int, default=1, help="renders per (font, text) pair")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--compare", type=Path, help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported as a regression")
+    parser.add_argument("--keep-output", action="store_true", help="keep files legacy styles write to fansign/generated")
+    parser.add_argument("--no-isolate", action="store_true", help="run every style in this process")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.package or sorted(PACKAGES),
+        set(args.style or ()),
+        set(args.font or ()),
+        args.iterations,
+        args.keep_output,
+        not args.no_isolate,
+    )
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(baseline, report, args.threshold)
+        for key, field, old, new, change in regressions:
+            print(f"REGRESSION {key} {field}: {old:.1f} -> {new:.1f} ({change:+.0%})")
+        if regressions:
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
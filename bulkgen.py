@@ -1,39 +1,37 @@
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
-from pathlib import Path
-import importlib
-import sys
-import re
+import io
+import time
+from commands import metrics
+from commands.catalog import font_catalog, style_catalog
+from commands.render import MissingRendererError, render_cached
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-FONTS_DIR = BASE_DIR / "fonts"
-STYLES_DIR = BASE_DIR / "commands" / "styles"
+BULK_RENDER_CONCURRENCY = 4
+DM_BATCH_SIZE = 5
 
 class BulkFanSign(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    def get_available_fonts(self):
-        return [f.stem for f in FONTS_DIR.iterdir() if f.suffix.lower() in {'.ttf', '.otf'}]
+    async def render_style(self, semaphore, style, user_id, text, font):
+        async with semaphore:
+            filename, image_bytes = await render_cached(f"commands.styles.{style}", user_id, text, font, command="bulkgen")
 
-    def get_available_styles(self):
-        styles = [
-            f.stem for f in STYLES_DIR.iterdir()
-            if f.is_file() and f.suffix == ".py" and not f.stem.startswith("__")
-        ]
-        return sorted(styles, key=self.style_sort_key)
-
-    def style_sort_key(self, style_name: str):
-        match = re.search(r'(\d+)', style_name)
-        number = int(match.group(1)) if match else 99999
-        return (number, style_name)
+        file = discord.File(io.BytesIO(image_bytes), filename=filename)
 
-    def import_style_module(self, style_name: str):
-        module_path = f"commands.styles.{style_name}"
-        if module_path in sys.modules:
-            return sys.modules[module_path]
-        return importlib.import_module(module_path)
+        embed = discord.Embed(
+            title="Your Fansign from .gg/esigns ",
+            description="Generated with love from [**.gg/esigns**](https://discord.gg/esigns) \nJoin us now at **.gg/esigns**!",
+            color=discord.Color.purple()
+        )
+        embed.add_field(name="Text", value=text, inline=True)
+        embed.add_field(name="Font", value=font, inline=True)
+        embed.add_field(name="Style", value=style + "\n\n[**.gg/esigns**](https://discord.gg/esigns)", inline=True)
+        embed.set_image(url=f"attachment://{filename}")
+        embed.set_footer(text=".gg/esigns • Join the original fansign community!")
+        return file, embed
 
     @app_commands.command(name="bulkgen", description="Generate multiple fansigns with different styles.")
     @app_commands.describe(
@@ -51,6 +49,7 @@ class BulkFanSign(commands.Cog):
         style10="Tenth style (optional)",
     )
     @app_commands.checks.cooldown(1, 10.0)
+    @metrics.instrument("bulkgen")
     async def bulkgen(
         self,
         interaction: discord.Interaction,
@@ -67,6 +66,8 @@ class BulkFanSign(commands.Cog):
         style9: str = None,
         style10: str = None,
     ):
+        validation_start = time.perf_counter()
+
         if len(text) > 14:
             embed = discord.Embed(
                 title="Error",
@@ -76,8 +77,8 @@ class BulkFanSign(commands.Cog):
             await interaction.response.send_message(embed=embed)
             return
 
-        available_fonts = self.get_available_fonts()
-        if font not in available_fonts:
+        if font not in font_catalog:
+            available_fonts = font_catalog.all()
             embed = discord.Embed(
                 title="Error",
                 description=f"Invalid font. Available fonts: {', '.join(available_fonts)}",
@@ -92,7 +93,6 @@ class BulkFanSign(commands.Cog):
         ]
         styles = [s.lower() for s in style_inputs if s]
 
-        available_styles = self.get_available_styles()
         if len(set(styles)) != len(styles):
             embed = discord.Embed(
                 title="Error",
@@ -103,7 +103,8 @@ class BulkFanSign(commands.Cog):
             return
 
         for style in styles:
-            if style not in available_styles:
+            if style not in style_catalog:
+                available_styles = style_catalog.all()
                 embed = discord.Embed(
                     title="Error",
                     description=f"Invalid style: {style}. Available styles: {', '.join(available_styles)}",
@@ -112,48 +113,32 @@ class BulkFanSign(commands.Cog):
                 await interaction.response.send_message(embed=embed)
                 return
 
+        metrics.observe_stage("bulkgen", "validation", time.perf_counter() - validation_start)
         await interaction.response.defer()
 
         try:
-            files = []
-            embeds = []
-
-            for i, style in enumerate(styles, start=1):
-                style_module = self.import_style_module(style)
-                func_name = f"generate_fansign_{style}"
-                if not hasattr(style_module, func_name):
-                    embed = discord.Embed(
-                        title="Error",
-                        description=f"Style {style} missing function {func_name}.",
-                        color=discord.Color.red()
-                    )
-                    await interaction.followup.send(embed=embed)
-                    return
-
-                generate_func = getattr(style_module, func_name)
-                out_path = await generate_func(interaction.user.id, text, font)
-
-                file = discord.File(str(out_path), filename=out_path.name)
-                files.append(file)
-
-                embed = discord.Embed(
-                    title="Your Fansign from .gg/esigns ",
-                    description="Generated with love from [**.gg/esigns**](https://discord.gg/esigns) \nJoin us now at **.gg/esigns**!",
-                    color=discord.Color.purple()
-                )
-                embed.add_field(name="Text", value=text, inline=True)
-                embed.add_field(name="Font", value=font, inline=True)
-                embed.add_field(name="Style", value=style + "\n\n[**.gg/esigns**](https://discord.gg/esigns)", inline=True)
-                embed.set_image(url=f"attachment://{out_path.name}")
-                embed.set_footer(text=".gg/esigns • Join the original fansign community!")
-                embeds.append(embed)
-
-            for i in range(0, len(embeds), 5):
-                await interaction.user.send(embeds=embeds[i:i+5], files=files[i:i+5])
+            semaphore = asyncio.Semaphore(BULK_RENDER_CONCURRENCY)
+            tasks = [
+                asyncio.create_task(self.render_style(semaphore, style, interaction.user.id, text, font))
+                for style in styles
+            ]
+
+            # later batches keep rendering while earlier ones are uploading
+            try:
+                for i in range(0, len(tasks), DM_BATCH_SIZE):
+                    results = await asyncio.gather(*tasks[i:i+DM_BATCH_SIZE])
+                    files = [file for file, _ in results]
+                    embeds = [embed for _, embed in results]
+                    with metrics.stage("bulkgen", "dm_send"):
+                        await interaction.user.send(embeds=embeds, files=files)
+            finally:
+                for task in tasks:
+                    task.cancel()
 
             await interaction.followup.send("Check your DMs for your fansigns.", ephemeral=True)
 
         except discord.Forbidden:
+            metrics.mark_error()
             embed = discord.Embed(
                 title="Error",
                 description="Couldn't DM you. Please enable DMs from server members.",
@@ -161,8 +146,18 @@ class BulkFanSign(commands.Cog):
             )
             await interaction.followup.send(embed=embed)
 
+        except MissingRendererError as e:
+            metrics.mark_error()
+            embed = discord.Embed(
+                title="Error",
+                description=f"Couldn't render every style: {e}.",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed)
+
         except Exception as e:
             print(f"Error in bulkgen: {e}")
+            metrics.mark_error()
             embed = discord.Embed(
                 title="Error",
                 description=f"An unexpected error occurred: {e}",
@@ -176,11 +171,10 @@ class BulkFanSign(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> list[app_commands.Choice[str]]:
-        fonts = self.get_available_fonts()
         return [
             app_commands.Choice(name=f, value=f)
-            for f in fonts if current.lower() in f.lower()
-        ][:25]
+            for f in font_catalog.search(current)
+        ]
 
     @bulkgen.autocomplete("style1")
     @bulkgen.autocomplete("style2")
@@ -197,7 +191,7 @@ class BulkFanSign(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> list[app_commands.Choice[str]]:
-        styles = self.get_available_styles()
+        styles = style_catalog.search(current, limit=None)
 
         focused_option = interaction.data.get('options')
         chosen_styles = set()
@@ -212,8 +206,7 @@ class BulkFanSign(commands.Cog):
         for style in styles:
             if style in chosen_styles and style != (interaction.data.get('data', {}).get('options', [{}])[0].get('value', '') or '').lower():
                 continue
-            if current.lower() in style.lower():
-                filtered_styles.append(app_commands.Choice(name=style, value=style))
+            filtered_styles.append(app_commands.Choice(name=style, value=style))
             if len(filtered_styles) >= 25:
                 break
         return filtered_styles
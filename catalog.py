@@ -0,0 +1,133 @@
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+FONTS_DIR = BASE_DIR / "fonts"
+STYLES_DIR = BASE_DIR / "commands" / "styles"
+PREMSTYLES_DIR = BASE_DIR / "commands" / "premstyles"
+
+FONT_SUFFIXES = {'.ttf', '.otf'}
+STYLE_SUFFIXES = {'.py', '.json'}
+
+REFRESH_INTERVAL = 5.0
+SEARCH_CACHE_SIZE = 1024
+
+
+def natural_sort_key(s):
+    return [int(text) if text.isdigit() else text.lower() for text in re.split(r'(\d+)', s)]
+
+
+def subsequence_span(query, name):
+    pos = -1
+    start = None
+    for ch in query:
+        pos = name.find(ch, pos + 1)
+        if pos == -1:
+            return None
+        if start is None:
+            start = pos
+    return pos - start
+
+
+class Catalog:
+    def __init__(self, directory, suffixes, modules=False, refresh_interval=REFRESH_INTERVAL):
+        self.directory = Path(directory)
+        self.suffixes = suffixes
+        self.modules = modules
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.names = ()
+        self.name_set = frozenset()
+        self.lowered = ()
+        self.search_cache = {}
+        self.mtime_ns = None
+        self.checked_at = None
+
+    def scan(self):
+        names = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                stem, suffix = os.path.splitext(entry.name)
+                if suffix.lower() not in self.suffixes:
+                    continue
+                if self.modules and (stem.startswith("__") or not entry.is_file()):
+                    continue
+                names.append(stem)
+        # a style can exist as both a module and a spec; list it once
+        return sorted(set(names), key=natural_sort_key)
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self.checked_at is not None and now - self.checked_at < self.refresh_interval:
+            return False
+
+        with self.lock:
+            self.checked_at = now
+            try:
+                mtime_ns = os.stat(self.directory).st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = None
+            if not force and mtime_ns == self.mtime_ns:
+                return False
+
+            names = self.scan() if mtime_ns is not None else []
+            self.names = tuple(names)
+            self.name_set = frozenset(names)
+            self.lowered = tuple(name.lower() for name in names)
+            self.search_cache = {}
+            self.mtime_ns = mtime_ns
+            return True
+
+    def all(self):
+        self.refresh()
+        return self.names
+
+    def __contains__(self, name):
+        self.refresh()
+        return name in self.name_set
+
+    def search(self, query, limit=25):
+        self.refresh()
+        query = query.lower()
+        cached = self.search_cache.get(query)
+        if cached is not None:
+            return cached[:limit]
+
+        ranked = []
+        for index, lowered in enumerate(self.lowered):
+            if not query:
+                ranked.append((0, 0, index))
+                continue
+            if lowered == query:
+                ranked.append((0, 0, index))
+                continue
+            pos = lowered.find(query)
+            if pos == 0:
+                ranked.append((1, 0, index))
+            elif pos > 0:
+                ranked.append((2, pos, index))
+            else:
+                span = subsequence_span(query, lowered)
+                if span is not None:
+                    ranked.append((3, span, index))
+
+        ranked.sort()
+        results = [self.names[index] for _, _, index in ranked]
+
+        if len(self.search_cache) >= SEARCH_CACHE_SIZE:
+            self.search_cache.clear()
+        self.search_cache[query] = results
+        return results[:limit]
+
+
+font_catalog = Catalog(FONTS_DIR, FONT_SUFFIXES)
+style_catalog = Catalog(STYLES_DIR, STYLE_SUFFIXES, modules=True)
+premstyle_catalog = Catalog(PREMSTYLES_DIR, STYLE_SUFFIXES, modules=True)
+
+
+def warm():
+    for catalog in (font_catalog, style_catalog, premstyle_catalog):
+        catalog.refresh(force=True)
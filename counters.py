@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+COUNTER_PATH = BASE_DIR / "generation_counts.json"
+GENERATED_PATH = BASE_DIR / "fansign" / "generated"
+
+WINDOW_MINUTES = 24 * 60
+
+
+def current_minute():
+    return int(time.time() // 60)
+
+
+class RollingCounter:
+    def __init__(self, window_minutes=WINDOW_MINUTES):
+        self.window_minutes = window_minutes
+        self.lock = threading.Lock()
+        self.minutes = [0] * window_minutes
+        self.counts = [0] * window_minutes
+        self.dirty = False
+
+    def add(self, amount=1, minute=None):
+        minute = current_minute() if minute is None else minute
+        if minute <= current_minute() - self.window_minutes:
+            return
+        slot = minute % self.window_minutes
+        with self.lock:
+            if self.minutes[slot] != minute:
+                self.minutes[slot] = minute
+                self.counts[slot] = 0
+            self.counts[slot] += amount
+            self.dirty = True
+
+    def total(self):
+        cutoff = current_minute() - self.window_minutes
+        with self.lock:
+            return sum(count for minute, count in zip(self.minutes, self.counts) if minute > cutoff)
+
+    def snapshot(self):
+        cutoff = current_minute() - self.window_minutes
+        with self.lock:
+            self.dirty = False
+            return {
+                str(minute): count
+                for minute, count in zip(self.minutes, self.counts)
+                if minute > cutoff and count
+            }
+
+    def load(self, path=COUNTER_PATH):
+        path = Path(path)
+        if not path.exists():
+            return False
+        with open(path) as f:
+            buckets = json.load(f)
+        for minute, count in buckets.items():
+            self.add(count, int(minute))
+        self.dirty = False
+        return True
+
+    def save(self, path=COUNTER_PATH):
+        path = Path(path)
+        buckets = self.snapshot()
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(buckets, f)
+        os.replace(tmp_path, path)
+
+    def seed_from_directory(self, directory=GENERATED_PATH):
+        if not Path(directory).exists():
+            return
+        cutoff = time.time() - self.window_minutes * 60
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                mtime = entry.stat().st_mtime
+                if mtime > cutoff:
+                    self.add(1, int(mtime // 60))
+
+
+generations = RollingCounter()
+
+
+def restore():
+    try:
+        if not generations.load():
+            # first start after upgrading: take one last look at the old output folder
+            generations.seed_from_directory()
+    except Exception as e:
+        print(f"Failed to restore generation counter: {e}")
@@ -0,0 +1,108 @@
+import functools
+import numpy as np
+from PIL import Image, ImageFilter
+
+# effects work on whole contiguous HxWxC arrays with per-channel parameters
+# broadcast over them; slicing out the color channels first makes every op strided and slow
+COLOR_MODES = ("RGB", "RGBA")
+
+
+def color_array(img):
+    # one copy out of PIL's buffer into a writable array; everything after that stays in numpy
+    if img.mode not in COLOR_MODES:
+        img = img.convert("RGBA")
+    return np.array(img)
+
+
+def to_image(arr):
+    # fromarray wraps the contiguous uint8 buffer instead of converting pixel by pixel
+    return Image.fromarray(np.ascontiguousarray(arr, dtype=np.uint8))
+
+
+def channel_vector(channels, color, alpha):
+    # a per-channel value that leaves alpha alone when there is one
+    return np.array(color[:3] + ((alpha,) if channels == 4 else ()), dtype=np.float32)
+
+
+def ink_bleed(img, radius=1.5, strength=0.6, roughness=0.3, seed=None):
+    img = img if img.mode == "RGBA" else img.convert("RGBA")
+    # the spread itself is a premultiplied box blur, which PIL runs in C;
+    # numpy adds the grain and the merge PIL has no filter for
+    spread = np.asarray(img.convert("RGBa").filter(ImageFilter.BoxBlur(radius)).convert("RGBA"))
+    arr = np.asarray(img)
+    alpha = arr[..., 3]
+
+    # bled pixels take the spread ink color, pixels already covered keep theirs
+    out = np.where((alpha == 0)[..., None], spread, arr)
+    grain = np.random.default_rng(seed).random(alpha.shape, dtype=np.float32)
+    grain *= -roughness
+    grain += 1.0
+    grain *= spread[..., 3]
+    grain *= strength
+    out[..., 3] = np.maximum(alpha, grain.astype(np.uint8))
+    return to_image(out)
+
+
+def tile_to(texture, size):
+    width, height = size
+    tex = np.asarray(texture.convert("L"))
+    reps = (-(-height // tex.shape[0]), -(-width // tex.shape[1]))
+    return np.tile(tex, reps)[:height, :width]
+
+
+def prepare_texture(texture, size, strength=0.35, channels=4):
+    # the blend factor only depends on the texture value, so it is a 256-entry table;
+    # styles prepare this once per template and pass it to paper_texture on every render
+    table = np.round(256 * (1.0 - strength + strength * np.arange(256) / 255.0)).astype(np.uint16)
+    factor = np.repeat(np.take(table, tile_to(texture, size))[..., None], channels, axis=2)
+    if channels == 4:
+        factor[..., 3] = 256
+    return factor
+
+
+def paper_texture(img, texture, strength=0.35):
+    arr = color_array(img)
+    factor = texture if isinstance(texture, np.ndarray) else prepare_texture(texture, img.size, strength, arr.shape[2])
+    blended = arr * factor
+    blended += 128
+    blended >>= 8
+    return to_image(blended)
+
+
+def noise(img, amount=8.0, monochrome=True, seed=None):
+    arr = color_array(img)
+    height, width, channels = arr.shape
+    scale = channel_vector(channels, (amount,) * 3, 0.0)
+    grain = np.random.default_rng(seed).standard_normal((height, width, 1 if monochrome else channels), dtype=np.float32)
+    grain = grain * scale
+    grain += arr
+    grain += 0.5
+    np.clip(grain, 0, 255, out=grain)
+    return to_image(grain)
+
+
+@functools.lru_cache(maxsize=64)
+def grade_lut(lift, gamma, gain, channels=4):
+    x = np.linspace(0.0, 1.0, 256)
+    luts = []
+    for channel_lift, channel_gamma, channel_gain in zip(lift, gamma, gain):
+        y = np.clip(x * channel_gain + channel_lift * (1.0 - x), 0.0, 1.0) ** (1.0 / channel_gamma)
+        luts.append(np.clip(np.round(y * 255), 0, 255).astype(np.uint8))
+    if channels == 4:
+        luts.append(np.arange(256, dtype=np.uint8))
+    return np.concatenate(luts).tolist()
+
+
+def color_grade(img, lift=(0.0, 0.0, 0.0), gamma=(1.0, 1.0, 1.0), gain=(1.0, 1.0, 1.0), saturation=1.0):
+    # the tables are built with numpy, but applying a per-channel table is exactly
+    # Image.point, which beats any gather numpy can do over the same buffer
+    if img.mode not in COLOR_MODES:
+        img = img.convert("RGBA")
+    img = img.point(grade_lut(tuple(lift), tuple(gamma), tuple(gain), len(img.getbands())))
+    if saturation == 1.0:
+        return img
+    gray = img.convert("L").convert(img.mode)
+    graded = Image.blend(gray, img, saturation)
+    if img.mode == "RGBA":
+        graded.putalpha(img.getchannel("A"))
+    return graded
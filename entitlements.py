@@ -0,0 +1,84 @@
+import asyncio
+import os
+import threading
+from commands.keystore import get_keystore
+
+POLL_INTERVAL = 5.0
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class EntitlementService:
+    def __init__(self, keystore, poll_interval=POLL_INTERVAL):
+        self.keystore = keystore
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.user_ids = set()
+        self.seq = 0
+        self.signature = None
+        self.watch_task = None
+        self.reload()
+
+    def has_premium(self, user_id):
+        return str(user_id) in self.user_ids
+
+    def grant(self, user_id):
+        self.user_ids.add(str(user_id))
+
+    def store_signature(self):
+        db_path = str(self.keystore.db_path)
+        return (file_signature(db_path), file_signature(db_path + "-wal"))
+
+    def reload(self):
+        with self.lock:
+            self.signature = self.store_signature()
+            self.seq = self.keystore.latest_redemption_seq()
+            self.user_ids = self.keystore.redeemed_user_ids()
+
+    def refresh(self):
+        signature = self.store_signature()
+        if signature == self.signature:
+            return False
+
+        previous = self.signature
+        if previous is None or previous[0] is None or signature[0] is None or previous[0][0] != signature[0][0]:
+            # the database file was replaced, so the redemption log can't be trusted
+            self.reload()
+            return True
+
+        with self.lock:
+            self.signature = signature
+            user_ids, self.seq = self.keystore.redemptions_since(self.seq)
+            self.user_ids |= user_ids
+        return True
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"Error refreshing premium entitlements: {e}")
+
+    def start(self):
+        if self.watch_task is None or self.watch_task.done():
+            self.watch_task = asyncio.get_running_loop().create_task(self.watch())
+        return self.watch_task
+
+
+_entitlements = None
+_entitlements_lock = threading.Lock()
+
+
+def get_entitlements():
+    global _entitlements
+    with _entitlements_lock:
+        if _entitlements is None:
+            _entitlements = EntitlementService(get_keystore())
+        return _entitlements
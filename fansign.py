@@ -1,41 +1,18 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from pathlib import Path
-import importlib
-import sys
-import re
 import io
-from PIL import Image, ImageFilter
+import time
+from commands import metrics
+from commands.catalog import font_catalog, style_catalog
+from commands.render import MissingRendererError, render_cached
 
 BLUR_SCALE = 3
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-FONTS_DIR = BASE_DIR / "fonts"
-STYLES_DIR = BASE_DIR / "commands" / "styles"
-
 class FanSign(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    def get_available_fonts(self):
-        return [f.stem for f in FONTS_DIR.iterdir() if f.suffix.lower() in {'.ttf', '.otf'}]
-
-    def get_available_styles(self):
-        def natural_sort_key(s):
-            return [int(text) if text.isdigit() else text.lower() for text in re.split(r'(\d+)', s)]
-
-        return sorted([
-            f.stem for f in STYLES_DIR.iterdir()
-            if f.is_file() and f.suffix == ".py" and not f.stem.startswith("__")
-        ], key=natural_sort_key)
-
-    def import_style_module(self, style_name: str):
-        module_path = f"commands.styles.{style_name}"
-        if module_path in sys.modules:
-            return sys.modules[module_path]
-        return importlib.import_module(module_path)
-
     @app_commands.command(name="fansign", description="Generate a fansign with custom text.")
     @app_commands.describe(
         text="Text to display (max 14 characters)",
@@ -43,6 +20,7 @@ class FanSign(commands.Cog):
         style="Choose a style layout"
     )
     @app_commands.checks.cooldown(1, 3.0)
+    @metrics.instrument("fansign")
     async def fansign(
         self,
         interaction: discord.Interaction,
@@ -50,59 +28,37 @@ class FanSign(commands.Cog):
         font: str,
         style: str
     ):
+        validation_start = time.perf_counter()
+
         if len(text) > 14:
             await interaction.response.send_message(
                 "bro the text can only be 14 characters or less read next time🤦", ephemeral=True
             )
             return
 
-        available_fonts = self.get_available_fonts()
-        if font not in available_fonts:
+        if font not in font_catalog:
+            available_fonts = font_catalog.all()
             await interaction.response.send_message(
                 f"invalid font. available fonts: {', '.join(available_fonts)}", ephemeral=True
             )
             return
 
-        available_styles = self.get_available_styles()
-        if style.lower() not in available_styles:
+        if style.lower() not in style_catalog:
+            available_styles = style_catalog.all()
             await interaction.response.send_message(
                 f"invalid style. available styles: {', '.join(available_styles)}", ephemeral=True
             )
             return
 
+        metrics.observe_stage("fansign", "validation", time.perf_counter() - validation_start)
         await interaction.response.defer()
 
         try:
-            style_module = self.import_style_module(style.lower())
-            generate_func_name = f"generate_fansign_{style.lower()}"
-            if hasattr(style_module, generate_func_name):
-                generate_func = getattr(style_module, generate_func_name)
-                out_path = await generate_func(interaction.user.id, text, font)
-            else:
-                await interaction.followup.send(f"style module missing function `{generate_func_name}`", ephemeral=True)
-                return
-
-            try:
-                with Image.open(out_path) as img:
-                    if img.mode not in ("RGBA", "RGB"):
-                        img = img.convert("RGBA")
-
-                    radius = max(0.0, float(BLUR_SCALE) / 5.0)
-
-                    blurred = img.filter(ImageFilter.GaussianBlur(radius=radius))
-
-                    img_buffer = io.BytesIO()
-                    blurred.save(img_buffer, format="PNG")
-                    img_buffer.seek(0)
-
-                    filename = out_path.name
-                    if not filename.lower().endswith(".png"):
-                        filename = Path(filename).with_suffix(".png").name
-
-                    file = discord.File(img_buffer, filename=filename)
-            except Exception as img_err:
-                print(f"Warning: could not blur image, sending original. Error: {img_err}")
-                file = discord.File(str(out_path), filename=out_path.name)
+            filename, image_bytes = await render_cached(
+                f"commands.styles.{style.lower()}",
+                interaction.user.id, text, font, BLUR_SCALE, command="fansign"
+            )
+            file = discord.File(io.BytesIO(image_bytes), filename=filename)
 
             embed = discord.Embed(
                 title="Your Fansign from .gg/esigns ",
@@ -127,15 +83,20 @@ class FanSign(commands.Cog):
                 style=discord.ButtonStyle.secondary
             ))
 
-            await interaction.followup.send(
-                content=f"here you go {interaction.user.mention} brought to you by .gg/esigns",
-                embeds=[embed],
-                file=file,
-                view=view
-            )
+            with metrics.stage("fansign", "upload"):
+                await interaction.followup.send(
+                    content=f"here you go {interaction.user.mention} brought to you by .gg/esigns",
+                    embeds=[embed],
+                    file=file,
+                    view=view
+                )
 
+        except MissingRendererError as e:
+            metrics.mark_error()
+            await interaction.followup.send(str(e), ephemeral=True)
         except Exception as e:
             print(f"Error generating fansign: {e}")
+            metrics.mark_error()
             await interaction.followup.send(f"error: `{e}`", ephemeral=True)
 
     @fansign.error
@@ -157,11 +118,10 @@ class FanSign(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> list[app_commands.Choice[str]]:
-        fonts = self.get_available_fonts()
         return [
             app_commands.Choice(name=f, value=f)
-            for f in fonts if current.lower() in f.lower()
-        ][:25]
+            for f in font_catalog.search(current)
+        ]
 
     @fansign.autocomplete("style")
     async def style_autocomplete(
@@ -169,11 +129,10 @@ class FanSign(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> list[app_commands.Choice[str]]:
-        styles = self.get_available_styles()
         return [
             app_commands.Choice(name=s, value=s)
-            for s in styles if current.lower() in s.lower()
-        ][:25]
+            for s in style_catalog.search(current)
+        ]
 
     @commands.Cog.listener()
     async def on_interaction(self, interaction: discord.Interaction):
@@ -0,0 +1,87 @@
+import io
+import threading
+from collections import OrderedDict
+from PIL import ImageFont
+from commands import metrics
+from commands.catalog import FONTS_DIR, FONT_SUFFIXES, font_catalog
+
+MAX_FONTS = 256
+
+_lock = threading.Lock()
+_fonts = OrderedDict()
+_font_data = {}
+_hits = 0
+_misses = 0
+
+
+def resolve_font_path(name):
+    for suffix in FONT_SUFFIXES:
+        for candidate in (FONTS_DIR / f"{name}{suffix}", FONTS_DIR / f"{name}{suffix.upper()}"):
+            if candidate.is_file():
+                return candidate
+    for path in FONTS_DIR.iterdir():
+        if path.stem == name and path.suffix.lower() in FONT_SUFFIXES:
+            return path
+    raise FileNotFoundError(f"font not found: {name}")
+
+
+def load_font_data(name):
+    data = _font_data.get(name)
+    if data is None:
+        data = resolve_font_path(name).read_bytes()
+        _font_data[name] = data
+    return data
+
+
+def get_font(name, size, variation=None):
+    global _hits, _misses
+    cache_key = (name, size, variation)
+    with _lock:
+        font = _fonts.get(cache_key)
+        if font is not None:
+            _fonts.move_to_end(cache_key)
+            _hits += 1
+            return font
+        _misses += 1
+
+    font = ImageFont.truetype(io.BytesIO(load_font_data(name)), size)
+    if isinstance(variation, str):
+        font.set_variation_by_name(variation)
+    elif variation is not None:
+        font.set_variation_by_axes(list(variation))
+
+    with _lock:
+        _fonts[cache_key] = font
+        _fonts.move_to_end(cache_key)
+        while len(_fonts) > MAX_FONTS:
+            _fonts.popitem(last=False)
+    return font
+
+
+def invalidate(name=None):
+    with _lock:
+        if name is None:
+            _fonts.clear()
+            _font_data.clear()
+            return
+        for cache_key in [k for k in _fonts if k[0] == name]:
+            del _fonts[cache_key]
+        _font_data.pop(name, None)
+
+
+def stats():
+    with _lock:
+        return {"entries": len(_fonts), "files": len(_font_data), "hits": _hits, "misses": _misses}
+
+
+def warm(sizes=()):
+    for name in font_catalog.all():
+        try:
+            load_font_data(name)
+            for size in sizes:
+                get_font(name, size)
+        except Exception as e:
+            print(f"Failed to warm font '{name}': {e}")
+
+
+metrics.cache_gauge("esigns_font_cache", "Font cache statistics.", stats)
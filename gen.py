@@ -1,57 +1,32 @@
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
-import random
-import string
-from pathlib import Path
+from commands import metrics
+from commands.entitlements import get_entitlements
+from commands.keystore import ALREADY_REDEEMED, INVALID_KEY, generate_key, get_keystore
 
-base_dir = Path(__file__).resolve().parent.parent
-keys_path = base_dir / "keys.txt"
 premium_role_id = 1403991225559678997
 
-def generate_key(length=20):
-    allowed_chars = string.ascii_letters + string.digits + "!$?"
-    return ''.join(random.choices(allowed_chars, k=length))
-
-def load_keys():
-    keys = {}
-    if not keys_path.exists():
-        return keys
-
-    with open(keys_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if ':' in line:
-                key, user_id = line.split(':', 1)
-                keys[key] = user_id
-            else:
-                keys[line] = None
-    return keys
-
-def save_keys(keys):
-    with open(keys_path, 'w') as f:
-        for key, user_id in keys.items():
-            if user_id:
-                f.write(f"{key}:{user_id}\n")
-            else:
-                f.write(f"{key}\n")
+# keystore calls wait on its lock, which /genkeys holds for a whole batch, so they run off the loop
+def add_new_key(keystore):
+    key = generate_key()
+    while not keystore.add_key(key):
+        key = generate_key()
+    return key
 
 class KeyGen(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
     @app_commands.command(name="1keygen", description="Generate a redeemable premium key")
+    @metrics.instrument("1keygen")
     async def gen(self, interaction: discord.Interaction):
         if interaction.user.id != 110332657337913344:
             await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
             return
 
-        key = generate_key()
-        keys = load_keys()
-        keys[key] = None
-        save_keys(keys)
+        key = await asyncio.to_thread(add_new_key, get_keystore())
 
         embed = discord.Embed(color=discord.Color.blue())
         embed.add_field(
@@ -67,19 +42,19 @@ class KeyGen(commands.Cog):
 
     @app_commands.command(name="redeem", description="Redeem a key")
     @app_commands.describe(key="The key to redeem")
+    @metrics.instrument("redeem")
     async def redeem(self, interaction: discord.Interaction, key: str):
-        keys = load_keys()
+        result = await asyncio.to_thread(get_keystore().redeem, key, interaction.user.id)
 
-        if key not in keys:
+        if result == INVALID_KEY:
             await interaction.response.send_message("Invalid key.", ephemeral=True)
             return
 
-        if keys[key] is not None:
+        if result == ALREADY_REDEEMED:
             await interaction.response.send_message("Key already redeemed.", ephemeral=True)
             return
 
-        keys[key] = str(interaction.user.id)
-        save_keys(keys)
+        get_entitlements().grant(interaction.user.id)
 
         guild = interaction.guild
         member = interaction.user
@@ -89,9 +64,11 @@ class KeyGen(commands.Cog):
             try:
                 await member.add_roles(role)
             except discord.Forbidden:
+                metrics.mark_error()
                 await interaction.response.send_message("Failed to assign premium role. Bot may be missing permissions.", ephemeral=True)
                 return
         else:
+            metrics.mark_error()
             await interaction.response.send_message("Premium role not found in this server.", ephemeral=True)
             return
 
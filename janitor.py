@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+GENERATED_PATH = BASE_DIR / "fansign" / "generated"
+
+DEFAULT_MAX_AGE = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_INTERVAL = 6 * 60 * 60
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_BATCH_PAUSE = 0.5
+
+
+def scan(directory):
+    files = []
+    if not Path(directory).exists():
+        return files
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, entry.path))
+    return files
+
+
+def select_expired(files, max_age, max_bytes, now=None):
+    now = time.time() if now is None else now
+    files = sorted(files)
+    cutoff = now - max_age if max_age is not None else None
+    total = sum(size for _, size, _ in files)
+
+    expired = []
+    for mtime, size, path in files:
+        too_old = cutoff is not None and mtime < cutoff
+        too_big = max_bytes is not None and total > max_bytes
+        if not (too_old or too_big):
+            break
+        expired.append((path, size))
+        total -= size
+    return expired
+
+
+def delete_batch(batch):
+    files = 0
+    reclaimed = 0
+    for path, size in batch:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"Janitor could not delete {path}: {e}")
+            continue
+        files += 1
+        reclaimed += size
+    return files, reclaimed
+
+
+async def sweep(
+    directory=GENERATED_PATH,
+    max_age=DEFAULT_MAX_AGE,
+    max_bytes=DEFAULT_MAX_BYTES,
+    batch_size=DEFAULT_BATCH_SIZE,
+    batch_pause=DEFAULT_BATCH_PAUSE
+):
+    files = await asyncio.to_thread(scan, directory)
+    expired = select_expired(files, max_age, max_bytes)
+
+    deleted = 0
+    reclaimed = 0
+    for i in range(0, len(expired), batch_size):
+        batch_files, batch_bytes = await asyncio.to_thread(delete_batch, expired[i:i+batch_size])
+        deleted += batch_files
+        reclaimed += batch_bytes
+        if i + batch_size < len(expired):
+            await asyncio.sleep(batch_pause)
+
+    return {"scanned": len(files), "deleted": deleted, "reclaimed_bytes": reclaimed}
+
+
+async def run_janitor(interval=DEFAULT_INTERVAL, **options):
+    while True:
+        try:
+            result = await sweep(**options)
+            print(
+                f"Janitor removed {result['deleted']} of {result['scanned']} file(s), "
+                f"reclaimed {result['reclaimed_bytes'] / (1024 * 1024):.1f} MiB"
+            )
+        except Exception as e:
+            print(f"Janitor sweep failed: {e}")
+        await asyncio.sleep(interval)
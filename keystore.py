@@ -0,0 +1,229 @@
+import secrets
+import sqlite3
+import string
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+KEYS_DB = BASE_DIR / "keys.db"
+LEGACY_KEYS_FILE = BASE_DIR / "keys.txt"
+
+KEY_ALPHABET = string.ascii_letters + string.digits + "!$?"
+KEY_LENGTH = 20
+
+REDEEMED = "redeemed"
+INVALID_KEY = "invalid"
+ALREADY_REDEEMED = "already_redeemed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS keys (
+    key TEXT PRIMARY KEY,
+    user_id TEXT
+);
+CREATE INDEX IF NOT EXISTS keys_user_id ON keys (user_id);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS redemptions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS keys_redeemed_update AFTER UPDATE OF user_id ON keys
+WHEN NEW.user_id IS NOT NULL AND OLD.user_id IS NULL
+BEGIN
+    INSERT INTO redemptions (user_id) VALUES (NEW.user_id);
+END;
+CREATE TRIGGER IF NOT EXISTS keys_redeemed_insert AFTER INSERT ON keys
+WHEN NEW.user_id IS NOT NULL
+BEGIN
+    INSERT INTO redemptions (user_id) VALUES (NEW.user_id);
+END;
+"""
+
+
+_ACCEPT_LIMIT = 256 - 256 % len(KEY_ALPHABET)
+_KEY_TABLE = bytes(KEY_ALPHABET.encode()[b % len(KEY_ALPHABET)] if b < _ACCEPT_LIMIT else 0 for b in range(256))
+_REJECTED = bytes(range(_ACCEPT_LIMIT, 256))
+
+
+def generate_keys(count, length=KEY_LENGTH):
+    # rejection sampling keeps the alphabet uniform; translate() does it in C
+    needed = count * length
+    chars = b""
+    while len(chars) < needed:
+        raw = secrets.token_bytes(int((needed - len(chars)) * 256 / _ACCEPT_LIMIT) + 16)
+        chars += raw.translate(_KEY_TABLE, _REJECTED)
+    text = chars[:needed].decode("ascii")
+    return [text[i:i + length] for i in range(0, needed, length)]
+
+
+def generate_key(length=KEY_LENGTH):
+    return generate_keys(1, length)[0]
+
+
+def parse_legacy_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    if ':' in line:
+        key, user_id = line.split(':', 1)
+        return key, user_id.strip() or None
+    return line, None
+
+
+class KeyStore:
+    def __init__(self, db_path=KEYS_DB):
+        self.db_path = Path(db_path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._backfill_redemptions()
+
+    def _backfill_redemptions(self):
+        # databases created before the redemption log existed
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM redemptions LIMIT 1").fetchone():
+                return
+            self.conn.execute(
+                "INSERT INTO redemptions (user_id) SELECT user_id FROM keys WHERE user_id IS NOT NULL"
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def add_key(self, key):
+        with self.lock:
+            cur = self.conn.execute("INSERT OR IGNORE INTO keys (key, user_id) VALUES (?, NULL)", (key,))
+            return cur.rowcount == 1
+
+    def add_keys(self, keys):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.conn.total_changes
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO keys (key, user_id) VALUES (?, NULL)",
+                    ((key,) for key in keys)
+                )
+                inserted = self.conn.total_changes - before
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return inserted
+
+    def insert_new_keys(self, keys):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS pending_keys (key TEXT PRIMARY KEY)")
+                self.conn.execute("DELETE FROM pending_keys")
+                self.conn.executemany("INSERT OR IGNORE INTO pending_keys (key) VALUES (?)", ((key,) for key in keys))
+                taken = {
+                    row[0] for row in
+                    self.conn.execute("SELECT p.key FROM pending_keys p JOIN keys k ON k.key = p.key")
+                }
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO keys (key, user_id) SELECT key, NULL FROM pending_keys"
+                )
+                self.conn.execute("DELETE FROM pending_keys")
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        seen = set()
+        inserted = []
+        for key in keys:
+            if key not in taken and key not in seen:
+                seen.add(key)
+                inserted.append(key)
+        return inserted
+
+    def contains(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM keys WHERE key = ?", (key,)).fetchone()
+            return row is not None
+
+    def redeem(self, key, user_id):
+        with self.lock:
+            cur = self.conn.execute(
+                "UPDATE keys SET user_id = ? WHERE key = ? AND user_id IS NULL",
+                (str(user_id), key)
+            )
+            if cur.rowcount == 1:
+                return REDEEMED
+            row = self.conn.execute("SELECT 1 FROM keys WHERE key = ?", (key,)).fetchone()
+            return ALREADY_REDEEMED if row is not None else INVALID_KEY
+
+    def has_redeemed(self, user_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM keys WHERE user_id = ? LIMIT 1", (str(user_id),)
+            ).fetchone()
+            return row is not None
+
+    def redeemed_user_ids(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT DISTINCT user_id FROM keys WHERE user_id IS NOT NULL").fetchall()
+            return {row[0] for row in rows}
+
+    def latest_redemption_seq(self):
+        with self.lock:
+            row = self.conn.execute("SELECT MAX(seq) FROM redemptions").fetchone()
+            return row[0] or 0
+
+    def redemptions_since(self, seq):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT seq, user_id FROM redemptions WHERE seq > ? ORDER BY seq", (seq,)
+            ).fetchall()
+        if not rows:
+            return set(), seq
+        return {user_id for _, user_id in rows}, rows[-1][0]
+
+    def import_legacy(self, keys_file=LEGACY_KEYS_FILE):
+        keys_file = Path(keys_file)
+        marker = f"imported:{keys_file.resolve()}"
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE name = ?", (marker,)).fetchone():
+                return 0
+            if not keys_file.exists():
+                return 0
+
+            with open(keys_file, 'r') as f:
+                rows = [row for row in map(parse_legacy_line, f) if row]
+
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+                # redeemed entries win over an unredeemed row for the same key
+                self.conn.executemany(
+                    "INSERT INTO keys (key, user_id) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET user_id = COALESCE(keys.user_id, excluded.user_id)",
+                    rows
+                )
+                imported = self.conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0] - before
+                self.conn.execute("INSERT INTO meta (name, value) VALUES (?, ?)", (marker, str(len(rows))))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            print(f"Imported {len(rows)} key(s) from {keys_file} into {self.db_path}")
+            return imported
+
+
+_keystore = None
+_keystore_lock = threading.Lock()
+
+
+def get_keystore():
+    global _keystore
+    with _keystore_lock:
+        if _keystore is None:
+            _keystore = KeyStore()
+            _keystore.import_legacy()
+        return _keystore
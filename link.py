@@ -1,15 +1,85 @@
+import asyncio
+import hashlib
+import io
+import tempfile
+from pathlib import Path
+import aiohttp
 import discord
 from discord import app_commands
 from discord.ext import commands
+from PIL import Image
+from commands import metrics, postprocess
+from commands.linkcache import LinkIndex
 
 TARGET_CHANNEL_ID = 1403389648452980870
 
+CHUNK_SIZE = 64 * 1024
+SPOOL_LIMIT = 1024 * 1024
+RECOMPRESS = True
+RECOMPRESS_THRESHOLD = 8 * 1024 * 1024
+RECOMPRESS_SKIP_TYPES = {"image/gif"}
+
+def recompress(buffer, filename):
+    buffer.seek(0)
+    with Image.open(buffer) as img:
+        img.load()
+        if img.mode not in ("RGBA", "RGB"):
+            img = img.convert("RGBA")
+        options = {**postprocess.settings, "format": "webp", "target_bytes": RECOMPRESS_THRESHOLD}
+        data, ext = postprocess.encode(img, options)
+    return io.BytesIO(data), Path(filename).with_suffix(ext).name
+
 class LinkCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.links = LinkIndex()
+        self.session = None
+        self.prune_task = None
+        metrics.cache_gauge("esigns_link_cache", "Link upload cache statistics.", self.link_stats)
+
+    def link_stats(self):
+        return {"hits": self.links.hits, "misses": self.links.misses}
+
+    async def cog_load(self):
+        self.session = aiohttp.ClientSession()
+        self.prune_task = asyncio.create_task(self.links.prune_periodically())
+
+    async def cog_unload(self):
+        if self.prune_task is not None:
+            self.prune_task.cancel()
+        if self.session is not None:
+            await self.session.close()
+        self.links.close()
+
+    async def download(self, image: discord.Attachment):
+        digest = hashlib.sha256()
+        buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT)
+        written = 0
+        async with self.session.get(image.url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                digest.update(chunk)
+                written += len(chunk)
+                # past the spool limit the buffer rolls over to a temp file, so those writes hit the disk
+                if written > SPOOL_LIMIT:
+                    await asyncio.to_thread(buffer.write, chunk)
+                else:
+                    buffer.write(chunk)
+        buffer.seek(0)
+        return digest.hexdigest(), buffer
+
+    def link_embed(self, image_url: str):
+        embed = discord.Embed(
+            title="Your Link from .gg/esigns ",
+            description=f"Here’s your copyable link from [**.gg/esigns**](https://discord.gg/esigns) \n\n`{image_url}`",
+            color=discord.Color.purple()
+        )
+        embed.set_footer(text=".gg/esigns • Join the original fansign community!")
+        return embed
 
     @app_commands.command(name="link", description="Upload an image and get a copyable branded link.")
     @app_commands.describe(image="Attach your image here")
+    @metrics.instrument("link")
     async def link(self, interaction: discord.Interaction, image: discord.Attachment):
         if not image.content_type or not image.content_type.startswith("image/"):
             await interaction.response.send_message("Please upload a valid image file.", ephemeral=True)
@@ -17,30 +87,45 @@ class LinkCommand(commands.Cog):
 
         await interaction.response.defer()
 
+        buffer = None
         try:
             channel = self.bot.get_channel(TARGET_CHANNEL_ID)
             if not channel:
+                metrics.mark_error()
                 await interaction.followup.send("Target channel not found.", ephemeral=True)
                 return
 
-            sent_msg = await channel.send(file=await image.to_file())
+            with metrics.stage("link", "download"):
+                digest, buffer = await self.download(image)
+
+            image_url = self.links.get(digest)
+            if image_url is not None:
+                await interaction.followup.send(embed=self.link_embed(image_url))
+                return
+
+            upload, filename = buffer, image.filename
+            if RECOMPRESS and image.size > RECOMPRESS_THRESHOLD and image.content_type not in RECOMPRESS_SKIP_TYPES:
+                upload, filename = await asyncio.to_thread(recompress, buffer, image.filename)
+
+            with metrics.stage("link", "upload"):
+                sent_msg = await channel.send(file=discord.File(upload, filename=filename))
             if not sent_msg.attachments:
+                metrics.mark_error()
                 await interaction.followup.send("Image failed to upload.", ephemeral=True)
                 return
 
             image_url = sent_msg.attachments[0].url
+            self.links.put(digest, image_url)
 
-            embed = discord.Embed(
-                title="Your Link from .gg/esigns ",
-                description=f"Here’s your copyable link from [**.gg/esigns**](https://discord.gg/esigns) \n\n`{image_url}`",
-                color=discord.Color.purple()
-            )
-            embed.set_footer(text=".gg/esigns • Join the original fansign community!")
-
-            await interaction.followup.send(embed=embed)
+            await interaction.followup.send(embed=self.link_embed(image_url))
 
         except Exception as e:
+            metrics.mark_error()
             await interaction.followup.send(f"An error occurred: `{e}`", ephemeral=True)
 
+        finally:
+            if buffer is not None:
+                buffer.close()
+
 async def setup(bot):
     await bot.add_cog(LinkCommand(bot))
@@ -0,0 +1,71 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LINKS_DB = BASE_DIR / "links.db"
+
+# discord signs attachment URLs and they stop working after about a day
+LINK_TTL = 20 * 60 * 60
+PRUNE_INTERVAL = 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    digest TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS links_created_at ON links (created_at);
+"""
+
+
+class LinkIndex:
+    def __init__(self, db_path=LINKS_DB, ttl=LINK_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url FROM links WHERE digest = ? AND created_at > ?",
+                (digest, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, digest, url):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO links (digest, url, created_at) VALUES (?, ?, ?)",
+                (digest, url, time.time())
+            )
+
+    def prune(self):
+        with self.lock:
+            cur = self.conn.execute("DELETE FROM links WHERE created_at <= ?", (time.time() - self.ttl,))
+            return cur.rowcount
+
+    async def prune_periodically(self, interval=PRUNE_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await asyncio.to_thread(self.prune)
+                if removed:
+                    print(f"Pruned {removed} expired link(s).")
+            except Exception as e:
+                print(f"Failed to prune links: {e}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
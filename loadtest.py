@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+import discord
+from discord import app_commands
+from commands import entitlements, keystore, metrics, render
+from commands.bulkgen import BulkFanSign
+from commands.catalog import font_catalog, premstyle_catalog, style_catalog
+from commands.fansign import FanSign
+from commands.gen import KeyGen
+from commands.premgen import PremiumFanSign
+from commands.privateroom import PremiumPrivateRoom
+from commands.roomscheduler import RoomExpiryScheduler
+
+# must match the ids hard-coded in PremiumFanSign.can_use_premgen and commands.gen
+PREMGEN_CATEGORY_ID = 1402021400507580466
+PREMIUM_ROLE_ID = 1403991225559678997
+
+DEFAULT_MIX = "fansign=60,premgen=20,bulkgen=5,redeem=10,privateroom=5"
+COMMANDS = {"fansign", "premgen", "bulkgen", "redeem", "privateroom"}
+LAG_INTERVAL = 0.01
+DEFAULT_PREMIUM_SHARE = 0.5
+# replies that turn a premium command away before it does any work
+REJECTIONS = ("You don't have premium access", "You already have a private room")
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.mention = f"<@{user_id}>"
+        self.dms = 0
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id
+
+    async def send(self, *args, **kwargs):
+        self.dms += 1
+
+    async def add_roles(self, *roles):
+        pass
+
+
+class FakeChannel:
+    _ids = itertools.count(10_000)
+
+    def __init__(self, guild, category, name="general"):
+        self.id = next(self._ids)
+        self.guild = guild
+        self.category = category
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.overwrites = {}
+        self.created_at = None
+
+    async def delete(self, reason=None):
+        self.guild.channels.pop(self.id, None)
+
+
+class FakeCategory:
+    def __init__(self, guild, category_id):
+        self.id = category_id
+        self.guild = guild
+
+    async def create_text_channel(self, name, overwrites=None, reason=None):
+        channel = FakeChannel(self.guild, self, name)
+        channel.overwrites = overwrites or {}
+        self.guild.channels[channel.id] = channel
+        return channel
+
+
+class FakeGuild:
+    def __init__(self, guild_id=1):
+        self.id = guild_id
+        self.default_role = FakeRole(guild_id)
+        self.channels = {}
+        self.roles = {PREMIUM_ROLE_ID: FakeRole(PREMIUM_ROLE_ID)}
+
+    @property
+    def text_channels(self):
+        return list(self.channels.values())
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+
+class FakeResponse:
+    def __init__(self):
+        self.done = False
+        self.messages = []
+
+    def is_done(self):
+        return self.done
+
+    async def send_message(self, content=None, **kwargs):
+        self.done = True
+        self.messages.append(content)
+
+    async def defer(self, **kwargs):
+        self.done = True
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        self.messages.append(content)
+
+
+class FakeInteraction:
+    def __init__(self, user, guild, channel):
+        self.user = user
+        self.guild = guild
+        self.channel = channel
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+        self.data = {}
+        # discord.py's cooldown buckets key off the interaction timestamp
+        self.created_at = discord.utils.utcnow()
+
+    async def edit_original_response(self, **kwargs):
+        pass
+
+
+class FakeBot:
+    def __init__(self, guild):
+        self.guilds = [guild]
+        self.loop = asyncio.get_running_loop()
+
+    def get_channel(self, channel_id):
+        return self.guilds[0].get_channel(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        return self.get_channel(channel_id)
+
+    async def wait_until_ready(self):
+        pass
+
+
+class LagProbe:
+    def __init__(self, interval=LAG_INTERVAL):
+        self.interval = interval
+        self.samples = []
+        self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self):
+        self.task.cancel()
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+class LoadTest:
+    def __init__(self, workdir, users, respect_cooldowns, premium_share=DEFAULT_PREMIUM_SHARE):
+        self.users = [FakeUser(100 + i) for i in range(users)]
+        self.respect_cooldowns = respect_cooldowns
+        self.guild = FakeGuild()
+        self.category = FakeCategory(self.guild, 2)
+        self.premium_category = FakeCategory(self.guild, PREMGEN_CATEGORY_ID)
+        self.channel = FakeChannel(self.guild, self.category)
+        self.premium_channel = FakeChannel(self.guild, self.premium_category)
+        self.bot = FakeBot(self.guild)
+
+        # point every store at the scratch directory; legacy styles that write their own
+        # files still write into the real fansign/generated
+        render.configure(archive=False)
+        keystore._keystore = keystore.KeyStore(Path(workdir) / "keys.db")
+        self.free_keys = keystore._keystore.insert_new_keys(keystore.generate_keys(len(self.users)))
+        # premium users redeem real keys up front so /premgen and /privateroom get past the gate
+        premium_users = random.sample(self.users, round(len(self.users) * premium_share))
+        premium_keys = keystore._keystore.insert_new_keys(keystore.generate_keys(len(premium_users)))
+        for key, user in zip(premium_keys, premium_users):
+            keystore._keystore.redeem(key, user.id)
+        entitlements._entitlements = entitlements.EntitlementService(keystore._keystore)
+
+        self.fansign = FanSign(self.bot)
+        self.premgen = PremiumFanSign(self.bot)
+        self.bulkgen = BulkFanSign(self.bot)
+        self.keygen = KeyGen(self.bot)
+        self.privateroom = PremiumPrivateRoom(self.bot)
+        self.privateroom.scheduler = RoomExpiryScheduler(
+            self.privateroom.expire_room, Path(workdir) / "private_rooms.json"
+        )
+        self.privateroom.scheduler.start()
+
+        self.fonts = font_catalog.all()
+        self.styles = style_catalog.all()
+        self.premstyles = premstyle_catalog.all()
+        if not self.fonts or not self.styles:
+            raise SystemExit("load test needs at least one font in fonts/ and one style in commands/styles")
+        self.results = []
+
+    def text(self):
+        return "".join(random.choices("abcdefghijklmnopqrstuvwxyz ", k=random.randint(1, 14)))
+
+    def invocation(self, name):
+        user = random.choice(self.users)
+        if name == "fansign":
+            return self.fansign, self.fansign.fansign, self.channel, user, {
+                "text": self.text(), "font": random.choice(self.fonts), "style": random.choice(self.styles)
+            }
+        if name == "premgen":
+            return self.premgen, self.premgen.premgen, self.premium_channel, user, {
+                "text": self.text(), "font": random.choice(self.fonts), "style": random.choice(self.premstyles)
+            }
+        if name == "bulkgen":
+            picks = random.sample(self.styles, min(len(self.styles), random.randint(1, 10)))
+            params = {"text": self.text(), "font": random.choice(self.fonts), "style1": picks[0]}
+            params.update({f"style{i}": style for i, style in enumerate(picks[1:], start=2)})
+            return self.bulkgen, self.bulkgen.bulkgen, self.channel, user, params
+        if name == "redeem":
+            key = self.free_keys.pop() if self.free_keys and random.random() < 0.8 else "not-a-key"
+            return self.keygen, self.keygen.redeem, self.channel, user, {"key": key}
+        if name == "privateroom":
+            return self.privateroom, self.privateroom.privateroom, self.channel, user, {}
+        raise ValueError(f"unknown command in mix: {name}")
+
+    async def invoke(self, name):
+        cog, command, channel, user, params = self.invocation(name)
+        interaction = FakeInteraction(user, self.guild, channel)
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            if self.respect_cooldowns:
+                await command._check_can_run(interaction)
+            await command.callback(cog, interaction, **params)
+            # cogs answer their own failures, so the instrumented outcome is what counts
+            if asyncio.current_task() in metrics.failed_commands:
+                status = "error"
+            elif any(str(message).startswith(REJECTIONS) for message in interaction.response.messages):
+                status = "rejected"
+        except app_commands.CommandOnCooldown:
+            status = "cooldown"
+        except Exception as e:
+            status = "error"
+            print(f"{name} failed: {e!r}")
+        self.results.append((name, status, time.perf_counter() - start))
+
+    def validate_mix(self, mix):
+        unknown = set(mix) - COMMANDS
+        if unknown:
+            raise SystemExit(f"unknown commands in mix: {', '.join(sorted(unknown))}")
+        mix = dict(mix)
+        if "premgen" in mix and not self.premstyles:
+            print("skipping premgen: no styles in commands/premstyles")
+            del mix["premgen"]
+        if not mix:
+            raise SystemExit("nothing left to run in the mix")
+        return mix
+
+    async def run(self, mix, total, concurrency):
+        mix = self.validate_mix(mix)
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(name):
+            async with semaphore:
+                await self.invoke(name)
+
+        probe = LagProbe()
+        probe.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(bounded(name) for name in random.choices(names, weights, k=total)))
+        elapsed = time.perf_counter() - started
+        probe.stop()
+        self.privateroom.scheduler.stop()
+        return self.report(elapsed, probe.samples)
+
+    def report(self, elapsed, lag_samples):
+        commands = {}
+        for name in sorted({name for name, _, _ in self.results}):
+            rows = [(status, latency) for n, status, latency in self.results if n == name]
+            latencies = [latency for status, latency in rows if status == "ok"]
+            commands[name] = {
+                "invocations": len(rows),
+                "ok": sum(1 for status, _ in rows if status == "ok"),
+                "errors": sum(1 for status, _ in rows if status == "error"),
+                "cooldowns": sum(1 for status, _ in rows if status == "cooldown"),
+                "rejected": sum(1 for status, _ in rows if status == "rejected"),
+                "p50_ms": (percentile(latencies, 0.5) or 0) * 1000,
+                "p95_ms": (percentile(latencies, 0.95) or 0) * 1000,
+                "p99_ms": (percentile(latencies, 0.99) or 0) * 1000,
+            }
+        return {
+            "elapsed_s": elapsed,
+            "throughput_per_s": len(self.results) / elapsed if elapsed else None,
+            "error_rate": sum(c["errors"] for c in commands.values()) / max(1, len(self.results)),
+            "loop_lag_ms": {
+                "p50": (percentile(lag_samples, 0.5) or 0) * 1000,
+                "p95": (percentile(lag_samples, 0.95) or 0) * 1000,
+                "max": max(lag_samples, default=0) * 1000,
+            },
+            "commands": commands,
+        }
+
+
+def print_report(report):
+    print(f"{report['throughput_per_s']:.1f} invocations/s over {report['elapsed_s']:.1f}s, error rate {report['error_rate']:.2%}")
+    lag = report["loop_lag_ms"]
+    print(f"event loop lag p50 {lag['p50']:.1f}ms  p95 {lag['p95']:.1f}ms  max {lag['max']:.1f}ms")
+    for name, row in report["commands"].items():
+        print(
+            f"{name:12} n={row['invocations']:6}  ok={row['ok']:6}  err={row['errors']:5}  cd={row['cooldowns']:5}  rej={row['rejected']:5}  "
+            f"p50 {row['p50_ms']:8.1f}ms  p95 {row['p95_ms']:8.1f}ms  p99 {row['p99_ms']:8.1f}ms"
+        )
+
+
+async def main_async(args):
+    print("note: styles that write their own output still write into fansign/generated")
+    with tempfile.TemporaryDirectory() as workdir:
+        test = LoadTest(workdir, args.users, args.respect_cooldowns, args.premium_share)
+        return await test.run(parse_mix(args.mix), args.requests, args.concurrency)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fire simulated slash commands at the cogs without Discord.")
+    parser.add_argument("--requests", type=int, default=1000, help="total command invocations")
+    parser.add_argument("--concurrency", type=int, default=100, help="invocations in flight at once")
+    parser.add_argument("--users", type=int, default=200, help="distinct fake users")
+    parser.add_argument(
+        "--premium-share", type=float, default=DEFAULT_PREMIUM_SHARE,
+        help="fraction of fake users that hold premium before the run"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted command mix, e.g. fansign=60,bulkgen=5")
+    parser.add_argument("--respect-cooldowns", action="store_true", help="run each command's checks, cooldowns included")
+    parser.add_argument("--seed", type=int, help="random seed for a reproducible run")
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
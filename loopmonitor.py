@@ -0,0 +1,93 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from commands import metrics
+
+DEFAULT_INTERVAL = 0.1
+DEFAULT_THRESHOLD = 0.25
+STACK_LIMIT = 25
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+loop_lag_seconds = metrics.registry.histogram(
+    "esigns_loop_lag_seconds", "Event loop scheduling lag.", buckets=LAG_BUCKETS
+)
+loop_stalls_total = metrics.registry.counter(
+    "esigns_loop_stalls_total", "Event loop stalls over the threshold, by command.", ("command",)
+)
+metrics.registry.gauge(
+    "esigns_loop_lag_quantile_seconds", "Event loop lag percentiles.", ("quantile",),
+    lambda: {(str(q),): loop_lag_seconds.quantile(q) or 0.0 for q in (0.5, 0.95, 0.99)}
+)
+
+
+def describe_task(task):
+    if task is None:
+        return "callback outside a task"
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", None) or task.get_name()
+
+
+class LoopMonitor:
+    def __init__(self, interval=DEFAULT_INTERVAL, threshold=DEFAULT_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.loop = None
+        self.loop_thread_id = None
+        self.heartbeat = time.monotonic()
+        self.task = None
+        self.thread = None
+        self.stopped = threading.Event()
+        self.reported_beat = None
+
+    async def run(self):
+        while True:
+            expected = self.loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, self.loop.time() - expected)
+            self.heartbeat = time.monotonic()
+            loop_lag_seconds.observe(value=lag)
+            if lag > self.threshold:
+                print(f"Event loop lagged {lag * 1000:.0f}ms")
+
+    def watchdog(self):
+        # runs in its own thread so it can look at the loop while the loop is stuck
+        while not self.stopped.wait(self.interval):
+            beat = self.heartbeat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or self.reported_beat == beat:
+                continue
+            self.reported_beat = beat
+            self.report_stall(stalled)
+
+    def report_stall(self, stalled):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        task = asyncio.current_task(self.loop)
+        command = metrics.active_commands.get(task, "none") if task is not None else "none"
+        loop_stalls_total.inc(command)
+
+        stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame is not None else "<no frame>\n"
+        print(
+            f"Event loop blocked for {stalled * 1000:.0f}ms+ "
+            f"(command: {command}, handler: {describe_task(task)})\n{stack}",
+            end=""
+        )
+
+    def start(self):
+        if self.task is not None and not self.task.done():
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.stopped.clear()
+        self.task = self.loop.create_task(self.run())
+        self.thread = threading.Thread(target=self.watchdog, name="loop-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
@@ -1,12 +1,15 @@
 import discord
-import os
-import threading
 import time
 from pathlib import Path
 from discord.ext import commands
 import json
-from datetime import datetime, timedelta
 import asyncio
+import hashlib
+from commands import catalog, counters, janitor, loopmonitor, metrics, postprocess, render, templates, transforms
+from commands.entitlements import get_entitlements
+from commands.styleregistry import style_registry
+
+process_start = time.perf_counter()
 
 base_dir = Path(__file__).resolve().parent
 config_path = base_dir / "config.json"
@@ -18,57 +21,173 @@ if not config_path.exists():
 with open(config_path) as f:
     config = json.load(f)
 
-def delete_generated_images():
-    pass
-
-threading.Timer(21600, delete_generated_images).start()
+PRESENCE_BASE_COUNT = 942
+COUNTER_SAVE_INTERVAL = 60
 
 def count_recent_fansigns():
-    now = datetime.now()
-    cutoff = now - timedelta(days=1)
-    count = 942
-    if GENERATED_PATH.exists():
-        for file in os.listdir(GENERATED_PATH):
-            filepath = GENERATED_PATH / file
-            if filepath.is_file():
-                created = datetime.fromtimestamp(filepath.stat().st_mtime)
-                if created > cutoff:
-                    count += 1
-    return count
+    return PRESENCE_BASE_COUNT + counters.generations.total()
 
 intents = discord.Intents.default()
 intents.message_content = True
 
 bot = commands.Bot(command_prefix="!", intents=intents)
 
+retention = config.get("retention", {})
+janitor_task = None
+metrics_config = config.get("metrics", {})
+metrics_runner = None
+monitor_config = config.get("loop_monitor", {})
+loop_monitor = loopmonitor.LoopMonitor(
+    interval=monitor_config.get("interval_seconds", loopmonitor.DEFAULT_INTERVAL),
+    threshold=monitor_config.get("threshold_seconds", loopmonitor.DEFAULT_THRESHOLD)
+)
+
+render.configure(
+    kind=config.get("render_executor", "thread"),
+    workers=config.get("render_workers"),
+    cache_bytes=config.get("render_cache_bytes", render.DEFAULT_MAX_BYTES),
+    archive=config.get("archive_renders", True),
+    prefetch_styles=config.get("prefetch_styles", 10),
+    font_warm_sizes=config.get("font_warm_sizes", [])
+)
+postprocess.configure(**config.get("output", {}))
+templates.configure(budget_bytes=config.get("template_cache_bytes", templates.DEFAULT_BUDGET_BYTES))
+transforms.configure(cache_to_disk=config.get("cache_transforms", True))
 async def presence_updater():
     await bot.wait_until_ready()
+    last_count = None
+    last_saved = time.monotonic()
     while not bot.is_closed():
         count = count_recent_fansigns()
-        status_text = f".gg/esigns | {count} generated in last 24h"
-        try:
-            await bot.change_presence(activity=discord.Game(name=status_text))
-        except Exception as e:
-            print(f"Error setting presence: {e}")
+        if count != last_count:
+            status_text = f".gg/esigns | {count} generated in last 24h"
+            try:
+                await bot.change_presence(activity=discord.Game(name=status_text))
+                last_count = count
+            except Exception as e:
+                print(f"Error setting presence: {e}")
+
+        if counters.generations.dirty and time.monotonic() - last_saved >= COUNTER_SAVE_INTERVAL:
+            try:
+                await asyncio.to_thread(counters.generations.save)
+                last_saved = time.monotonic()
+            except Exception as e:
+                print(f"Error saving generation counter: {e}")
         await asyncio.sleep(10)
 
-@bot.event
-async def on_ready():
-    print(f"Logged in as {bot.user}")
+EXTENSIONS = [
+    "commands.fansign", "commands.gen", "commands.premgen", "commands.bulkgen", "commands.secret",
+    "commands.receiptgen", "commands.privateroom", "commands.link", "commands.stats"
+]
+SYNC_HASH_PATH = base_dir / "command_sync.sha256"
 
-    bot.loop.create_task(presence_updater())
-
-    for ext in ["commands.fansign", "commands.gen", "commands.premgen", "commands.bulkgen", "commands.secret", "commands.receiptgen", "commands.privateroom", "commands.link"]:
+def command_schema_hash():
+    payload = []
+    for command in bot.tree.get_commands():
         try:
-            await bot.load_extension(ext)
-            print(f"Extension '{ext}' loaded.")
-        except Exception as e:
-            print(f"Failed to load extension '{ext}': {e}")
+            payload.append(command.to_dict(bot.tree))
+        except TypeError:
+            payload.append(command.to_dict())
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+async def load_extension(ext):
+    try:
+        await bot.load_extension(ext)
+        print(f"Extension '{ext}' loaded.")
+    except Exception as e:
+        print(f"Failed to load extension '{ext}': {e}")
+
+def warm_caches():
+    catalog.warm()
+    render.warm()
+
+async def sync_commands():
+    schema_hash = command_schema_hash()
+    if SYNC_HASH_PATH.exists() and SYNC_HASH_PATH.read_text().strip() == schema_hash:
+        return False
+    await bot.tree.sync()
+    SYNC_HASH_PATH.write_text(schema_hash)
+    return True
+
+async def setup_hook():
+    global janitor_task, metrics_runner
+    timings = {"login": time.perf_counter() - process_start}
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        asyncio.to_thread(warm_caches),
+        asyncio.to_thread(counters.restore),
+        *(load_extension(ext) for ext in EXTENSIONS)
+    )
+    timings["extensions+warm"] = time.perf_counter() - start
 
+    start = time.perf_counter()
     try:
-        await bot.tree.sync()
-        print("Slash commands synced.")
+        synced = await sync_commands()
+        print("Slash commands synced." if synced else "Slash command schema unchanged, skipping sync.")
     except Exception as e:
         print(f"Failed to sync slash commands: {e}")
+    timings["sync"] = time.perf_counter() - start
+
+    bot.loop.create_task(presence_updater())
+    bot.loop.create_task(style_registry.persist_usage())
+    get_entitlements().start()
+    if monitor_config.get("enabled", True):
+        loop_monitor.start()
+
+    janitor_task = bot.loop.create_task(janitor.run_janitor(
+        interval=retention.get("interval_seconds", janitor.DEFAULT_INTERVAL),
+        directory=GENERATED_PATH,
+        max_age=retention.get("max_age_seconds", janitor.DEFAULT_MAX_AGE),
+        max_bytes=retention.get("max_bytes", janitor.DEFAULT_MAX_BYTES),
+        batch_size=retention.get("batch_size", janitor.DEFAULT_BATCH_SIZE)
+    ))
+
+    if metrics_config.get("enabled", True):
+        try:
+            metrics_runner = await metrics.start_server(
+                host=metrics_config.get("host", "127.0.0.1"),
+                port=metrics_config.get("port", 9108)
+            )
+        except Exception as e:
+            print(f"Failed to start metrics endpoint: {e}")
+
+    timings["total"] = time.perf_counter() - process_start
+    print("Startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+
+bot.setup_hook = setup_hook
+
+async def close():
+    global janitor_task, metrics_runner
+    await commands.Bot.close(bot)
+    # flush what the periodic savers haven't written yet; each step runs even if another fails
+    if janitor_task is not None:
+        janitor_task.cancel()
+        janitor_task = None
+    loop_monitor.stop()
+    if metrics_runner is not None:
+        try:
+            await metrics_runner.cleanup()
+        except Exception as e:
+            print(f"Error stopping metrics endpoint: {e}")
+        metrics_runner = None
+    for name, flush in (
+        ("generation counter", counters.generations.save),
+        ("style usage", style_registry.save_usage),
+        ("render workers", render.shutdown),
+    ):
+        try:
+            await asyncio.to_thread(flush)
+        except Exception as e:
+            print(f"Error flushing {name} on close: {e}")
+
+bot.close = close
+
+@bot.event
+async def on_ready():
+    print(f"Logged in as {bot.user}")
 
-bot.run(config["token"])
+# spawned render workers import this module as __mp_main__ and must not log in again
+if __name__ == "__main__":
+    bot.run(config["token"])
@@ -0,0 +1,290 @@
+import asyncio
+import functools
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from aiohttp import web
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, self.labels, key, value) for key, value in self.values.items()]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def set(self, *label_values, value):
+        with self.lock:
+            self.values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                return [(self.name, self.labels, key, value) for key, value in self.callback().items()]
+            except Exception as e:
+                print(f"Error collecting gauge {self.name}: {e}")
+                return []
+        with self.lock:
+            return [(self.name, self.labels, key, value) for key, value in self.values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def observe(self, *label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = [[0] * (len(self.buckets) + 1), 0, 0.0]
+                self.values[label_values] = entry
+            entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def quantile(self, q, *label_values):
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None or entry[1] == 0:
+                return None
+            counts, total = list(entry[0]), entry[1]
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            if count and seen + count >= rank:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def summary(self, *label_values):
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                return 0, 0.0
+            return entry[1], entry[2]
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            items = [(key, list(counts), count, total) for key, (counts, count, total) in self.values.items()]
+        labels = self.labels + ("le",)
+        for key, counts, count, total in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((f"{self.name}_bucket", labels, key + (le,), cumulative))
+            samples.append((f"{self.name}_count", self.labels, key, count))
+            samples.append((f"{self.name}_sum", self.labels, key, total))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=(), callback=None):
+        return self.register(Gauge(name, help_text, labels, callback))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def exposition(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, values, value in metric.samples():
+                lines.append(f"{name}{format_labels(labels, values)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+commands_total = registry.counter(
+    "esigns_commands_total", "Slash command invocations by outcome.", ("command", "status")
+)
+command_seconds = registry.histogram(
+    "esigns_command_seconds", "End-to-end slash command latency.", ("command",)
+)
+stage_seconds = registry.histogram(
+    "esigns_stage_seconds", "Latency of each pipeline stage.", ("command", "stage")
+)
+render_queue_depth = registry.gauge(
+    "esigns_render_queue_depth", "Render jobs submitted to the executor and not yet finished."
+)
+
+# task -> command name, read by the loop monitor to attribute stalls
+active_commands = weakref.WeakKeyDictionary()
+# tasks whose command caught and reported its own failure
+failed_commands = weakref.WeakSet()
+
+
+# hits and misses counted in render worker processes, merged into the gauges of the main process
+COUNT_FIELDS = ("hits", "misses")
+cache_collectors = {}
+_worker_counts_lock = threading.Lock()
+_worker_counts = {}
+
+
+def cache_gauge(name, help_text, collect):
+    cache_collectors[name] = collect
+
+    def callback():
+        stats = dict(collect())
+        with _worker_counts_lock:
+            for field, value in _worker_counts.get(name, {}).items():
+                stats[field] = stats.get(field, 0) + value
+        return {(key,): value for key, value in stats.items()}
+    return registry.gauge(name, help_text, ("field",), callback)
+
+
+def cache_counts():
+    counts = {}
+    for name, collect in cache_collectors.items():
+        stats = collect()
+        counts[name] = {field: stats.get(field, 0) for field in COUNT_FIELDS}
+    return counts
+
+
+def cache_count_delta(before):
+    delta = {}
+    for name, counts in cache_counts().items():
+        changed = {field: value - before.get(name, {}).get(field, 0) for field, value in counts.items()}
+        if any(changed.values()):
+            delta[name] = changed
+    return delta
+
+
+def merge_worker_counts(delta):
+    with _worker_counts_lock:
+        for name, counts in delta.items():
+            merged = _worker_counts.setdefault(name, {})
+            for field, value in counts.items():
+                merged[field] = merged.get(field, 0) + value
+
+
+def observe_stage(command, stage, seconds):
+    stage_seconds.observe(command, stage, value=seconds)
+
+
+@contextmanager
+def stage(command, stage_name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(command, stage_name, time.perf_counter() - start)
+
+
+def mark_error():
+    # cogs answer the user from their own except blocks, so instrument never sees those exceptions
+    task = asyncio.current_task()
+    if task is not None:
+        failed_commands.add(task)
+
+
+def instrument(command):
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = "ok"
+            task = asyncio.current_task()
+            if task is not None:
+                active_commands[task] = command
+                # the mark outlives the call so callers like the load test can read the outcome
+                failed_commands.discard(task)
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                if task is not None:
+                    active_commands.pop(task, None)
+                    if task in failed_commands:
+                        status = "error"
+                command_seconds.observe(command, value=time.perf_counter() - start)
+                commands_total.inc(command, status)
+        return wrapper
+    return decorator
+
+
+async def handle_metrics(request):
+    return web.Response(text=registry.exposition(), content_type="text/plain", charset="utf-8")
+
+
+async def start_server(host="127.0.0.1", port=9108):
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    print(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return runner
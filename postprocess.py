@@ -0,0 +1,123 @@
+import io
+import math
+from PIL import Image, ImageFilter
+
+BLUR_METHODS = {"gaussian", "box", "downscale", "auto"}
+OUTPUT_FORMATS = {"png", "webp", "jpeg"}
+LOSSY_FORMATS = {"webp", "jpeg"}
+DOWNSCALE_MIN_RADIUS = 8
+
+DEFAULT_SETTINGS = {
+    "blur_method": "auto",
+    "format": "png",
+    "png_compress_level": 3,
+    "quality": 90,
+    "min_quality": 60,
+    "target_bytes": 8 * 1024 * 1024,
+    "fallback_format": "webp",
+}
+
+settings = dict(DEFAULT_SETTINGS)
+
+
+def configure(**overrides):
+    unknown = set(overrides) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ValueError(f"unknown postprocess settings: {', '.join(sorted(unknown))}")
+    merged = {**DEFAULT_SETTINGS, **overrides}
+    if merged["blur_method"] not in BLUR_METHODS:
+        raise ValueError(f"unknown blur method: {merged['blur_method']}")
+    for key in ("format", "fallback_format"):
+        if merged[key] is not None and merged[key] not in OUTPUT_FORMATS:
+            raise ValueError(f"unknown output format: {merged[key]}")
+    settings.clear()
+    settings.update(merged)
+
+
+def box_radius(sigma, passes=3):
+    # n box passes of width 2r+1 have variance n * ((2r+1)^2 - 1) / 12
+    return (math.sqrt(12.0 * sigma * sigma / passes + 1.0) - 1.0) / 2.0
+
+
+def box_blur(img, radius, passes=3):
+    r = box_radius(radius, passes)
+    for _ in range(passes):
+        img = img.filter(ImageFilter.BoxBlur(r))
+    return img
+
+
+def downscale_blur(img, radius):
+    factor = max(1, int(radius // 2))
+    if factor == 1:
+        return box_blur(img, radius)
+    small = img.resize(
+        (max(1, img.width // factor), max(1, img.height // factor)),
+        Image.Resampling.BOX
+    )
+    small = box_blur(small, radius / factor)
+    return small.resize(img.size, Image.Resampling.BILINEAR)
+
+
+def fast_blur(img, radius, method=None):
+    method = method or settings["blur_method"]
+    if radius <= 0:
+        return img
+    if method == "auto":
+        # GaussianBlur is already a 3-pass box blur in one C call; only downscaling beats it,
+        # and only once the radius is large enough to shrink the image by 4x or more
+        method = "downscale" if radius >= DOWNSCALE_MIN_RADIUS else "gaussian"
+    if method == "gaussian":
+        return img.filter(ImageFilter.GaussianBlur(radius=radius))
+    if method == "downscale":
+        return downscale_blur(img, radius)
+    return box_blur(img, radius)
+
+
+def save(img, fmt, quality, compress_level):
+    buffer = io.BytesIO()
+    if fmt == "png":
+        img.save(buffer, format="PNG", compress_level=compress_level)
+    elif fmt == "webp":
+        img.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def fit_lossy(img, fmt, quality, min_quality, target_bytes):
+    data = save(img, fmt, quality, None)
+    if target_bytes is None or len(data) <= target_bytes:
+        return data
+
+    low, high = min_quality, quality - 1
+    best = None
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = save(img, fmt, mid, None)
+        if len(candidate) <= target_bytes:
+            best = candidate
+            low = mid + 1
+        else:
+            high = mid - 1
+    return best if best is not None else save(img, fmt, min_quality, None)
+
+
+def encode(img, options=None):
+    options = options or settings
+    fmt = options["format"]
+    target_bytes = options["target_bytes"]
+
+    if fmt in LOSSY_FORMATS:
+        return fit_lossy(img, fmt, options["quality"], options["min_quality"], target_bytes), extension(fmt)
+
+    data = save(img, fmt, None, options["png_compress_level"])
+    fallback = options["fallback_format"]
+    if target_bytes is not None and len(data) > target_bytes and fallback in LOSSY_FORMATS:
+        return fit_lossy(img, fallback, options["quality"], options["min_quality"], target_bytes), extension(fallback)
+    return data, extension(fmt)
+
+
+def extension(fmt):
+    return ".jpg" if fmt == "jpeg" else f".{fmt}"
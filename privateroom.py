@@ -1,30 +1,98 @@
-import asyncio
+import time
 import discord
 from discord import app_commands
 from discord.ext import commands
-from pathlib import Path
+from commands import metrics
+from commands.entitlements import get_entitlements
+from commands.roomscheduler import RoomExpiryScheduler
+
+ROOM_PREFIX = "private-"
+ROOM_LIFETIME = 1800
+
+def is_member_target(target):
+    # without the members intent, overwrites for uncached members come back as discord.Object
+    if isinstance(target, (discord.Member, discord.User)):
+        return True
+    return isinstance(target, discord.Object) and getattr(target, "type", None) is not discord.Role
+
+def room_candidate(channel: discord.TextChannel):
+    # only the exact overwrites /privateroom creates: @everyone denied, one member allowed;
+    # the caller still checks the channel is named after that member
+    overwrites = channel.overwrites
+    if len(overwrites) != 2:
+        return None
+    default_role = channel.guild.default_role
+    default_overwrite = overwrites.get(default_role)
+    if default_overwrite is None or default_overwrite.view_channel is not False:
+        return None
+    for target, overwrite in overwrites.items():
+        if target.id == default_role.id or not is_member_target(target):
+            continue
+        if overwrite.view_channel and overwrite.send_messages:
+            return target
+    return None
 
 class PremiumPrivateRoom(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.scheduler = RoomExpiryScheduler(self.expire_room)
+        self.scheduler.load()
+
+    async def cog_load(self):
+        self.scheduler.start()
 
-    def load_redeemed_ids(self):
-        ids = set()
-        keys_file = Path(__file__).resolve().parent.parent / "keys.txt"
-        if not keys_file.exists():
-            return ids
-        with open(keys_file, 'r') as f:
-            for line in f:
-                parts = line.strip().split(":")
-                if len(parts) == 2:
-                    ids.add(parts[1].strip())
-        return ids
+    async def cog_unload(self):
+        self.scheduler.stop()
 
     def has_premium(self, user_id: int):
-        return str(user_id) in self.load_redeemed_ids()
+        return get_entitlements().has_premium(user_id)
+
+    async def expire_room(self, channel_id: int, room: dict):
+        await self.bot.wait_until_ready()
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            try:
+                channel = await self.bot.fetch_channel(channel_id)
+            except discord.NotFound:
+                return
+        try:
+            await channel.delete(reason="Private room expired after 30 minutes")
+        except discord.NotFound:
+            pass
+
+    async def adopt_room(self, channel: discord.TextChannel):
+        if not channel.name.startswith(ROOM_PREFIX) or self.scheduler.is_tracked(channel.id):
+            return
+        target = room_candidate(channel)
+        if target is None:
+            return
+        name = getattr(target, "name", None)
+        if name is None:
+            try:
+                name = (await channel.guild.fetch_member(target.id)).name
+            except discord.HTTPException:
+                # can't confirm who the room belongs to, so it may be a staff channel
+                return
+        if channel.name != f"{ROOM_PREFIX}{name}".lower():
+            return
+        deadline = channel.created_at.timestamp() + ROOM_LIFETIME
+        await self.scheduler.schedule(channel.guild.id, channel.id, target.id, deadline)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # rooms created by an older version that never persisted them still need to expire;
+        # rooms in the scheduler file are already tracked and skipped
+        for guild in self.bot.guilds:
+            for channel in guild.text_channels:
+                await self.adopt_room(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        await self.scheduler.forget(channel.id)
 
     @app_commands.command(name="privateroom", description="Create a private room for 30 Minutes (premium only).")
     @app_commands.checks.cooldown(1, 5.0)
+    @metrics.instrument("privateroom")
     async def privateroom(self, interaction: discord.Interaction):
         if not self.has_premium(interaction.user.id):
             await interaction.response.send_message(
@@ -41,15 +109,14 @@ class PremiumPrivateRoom(commands.Cog):
             )
             return
 
-        for channel in interaction.guild.text_channels:
-            if (channel.name.startswith("private-") and
-                channel.category == category and
-                channel.overwrites_for(interaction.user).view_channel):
-                await interaction.response.send_message(
-                    f"You already have a private room: {channel.mention}. Please wait until it is deleted.",
-                    ephemeral=True
-                )
-                return
+        existing_id = self.scheduler.room_for(interaction.guild.id, interaction.user.id)
+        channel = interaction.guild.get_channel(existing_id) if existing_id else None
+        if channel is not None and channel.category == category:
+            await interaction.response.send_message(
+                f"You already have a private room: {channel.mention}. Please wait until it is deleted.",
+                ephemeral=True
+            )
+            return
 
         overwrites = {
             interaction.guild.default_role: discord.PermissionOverwrite(view_channel=False),
@@ -57,22 +124,19 @@ class PremiumPrivateRoom(commands.Cog):
         }
 
         private_channel = await category.create_text_channel(
-            name=f"private-{interaction.user.name}",
+            name=f"{ROOM_PREFIX}{interaction.user.name}",
             overwrites=overwrites,
             reason="Premium private room creation"
         )
+        await self.scheduler.schedule(
+            interaction.guild.id, private_channel.id, interaction.user.id, time.time() + ROOM_LIFETIME
+        )
 
         await interaction.response.send_message(
             f"{interaction.user.mention}, your private room {private_channel.mention} has been created for 30 Minutes.",
             ephemeral=True
         )
 
-        await asyncio.sleep(1800)
-        try:
-            await private_channel.delete(reason="Private room expired after 30 minutes")
-        except discord.NotFound:
-            pass
-
     @privateroom.error
     async def privateroom_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         if isinstance(error, app_commands.errors.CommandOnCooldown):
@@ -0,0 +1,227 @@
+import asyncio
+import functools
+import inspect
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from PIL import Image
+from commands import fontcache, metrics, postprocess
+from commands.counters import generations
+from commands.resultcache import DEFAULT_MAX_BYTES, ResultCache, render_key
+from commands.styleengine import GENERATE_PREFIX, RENDER_PREFIX
+from commands.styleregistry import DEFAULT_PREFETCH, style_registry
+
+EXECUTOR_KINDS = {"thread", "process"}
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ARCHIVE_DIR = BASE_DIR / "fansign" / "generated"
+
+_executor = None
+_archive_executor = None
+_kind = "thread"
+_workers = None
+_archive = True
+_warm_args = (DEFAULT_PREFETCH, ())
+
+result_cache = ResultCache()
+metrics.cache_gauge("esigns_render_cache", "Render result cache statistics.", result_cache.stats)
+
+
+def configure(kind="thread", workers=None, cache_bytes=DEFAULT_MAX_BYTES, archive=True,
+              prefetch_styles=DEFAULT_PREFETCH, font_warm_sizes=()):
+    global _executor, _kind, _workers, _archive, _warm_args
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"unknown render executor kind: {kind}")
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    _kind = kind
+    _workers = workers
+    _archive = archive
+    _warm_args = (prefetch_styles, tuple(font_warm_sizes))
+    result_cache.max_bytes = cache_bytes
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        workers = _workers or os.cpu_count() or 1
+        if _kind == "process":
+            # forked workers would inherit the running loop, gateway threads and SQLite handles
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_renderer, initargs=_warm_args
+            )
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+    return _executor
+
+
+def warm_renderer(prefetch_styles=DEFAULT_PREFETCH, font_warm_sizes=()):
+    # only the most-used styles are imported up front, the rest load on first use;
+    # their fonts are parsed at the sizes those specs start fitting text from
+    style_registry.prefetch(prefetch_styles)
+    fontcache.warm(sizes=sorted(set(font_warm_sizes) | set(style_registry.font_sizes())))
+
+
+def warm():
+    if _kind == "process":
+        # the main process never renders, but it still records style usage and saves it
+        style_registry.load_usage()
+        # spawned workers start all at once on the first submit and warm up in the pool initializer
+        get_executor().submit(int)
+    else:
+        warm_renderer(*_warm_args)
+
+
+def shutdown():
+    global _executor, _archive_executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _archive_executor is not None:
+        _archive_executor.shutdown(wait=True)
+        _archive_executor = None
+
+
+class MissingRendererError(LookupError):
+    pass
+
+
+def find_renderer(module, style_name):
+    for prefix in (RENDER_PREFIX, GENERATE_PREFIX):
+        func_name = f"{prefix}{style_name}"
+        if hasattr(module, func_name):
+            return func_name
+    return None
+
+
+def blur_image(img, blur_scale, method=None):
+    if img.mode not in ("RGBA", "RGB"):
+        img = img.convert("RGBA")
+    radius = max(0.0, float(blur_scale) / 5.0)
+    return postprocess.fast_blur(img, radius, method)
+
+
+def blur_and_encode(out_path, blur_scale, output=None, timings=None):
+    timings = {} if timings is None else timings
+    with Image.open(out_path) as img:
+        start = time.perf_counter()
+        blurred = blur_image(img, blur_scale, (output or postprocess.settings)["blur_method"])
+        timings["blur"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    encoded = postprocess.encode(blurred, output)
+    timings["encode"] = time.perf_counter() - start
+    return encoded
+
+
+def write_archive(filename, data):
+    try:
+        ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        (ARCHIVE_DIR / filename).write_bytes(data)
+    except Exception as e:
+        print(f"Warning: could not archive {filename}: {e}")
+
+
+def archive_render(filename, data):
+    global _archive_executor
+    if _archive_executor is None:
+        _archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+    _archive_executor.submit(write_archive, filename, data)
+
+
+def render_image(img, style_name, user_id, blur_scale=None, archive=False, output=None, timings=None):
+    timings = {} if timings is None else timings
+    if blur_scale is not None:
+        start = time.perf_counter()
+        try:
+            img = blur_image(img, blur_scale, (output or postprocess.settings)["blur_method"])
+        except Exception as img_err:
+            print(f"Warning: could not blur image, sending original. Error: {img_err}")
+        timings["blur"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data, ext = postprocess.encode(img, output)
+    timings["encode"] = time.perf_counter() - start
+
+    if archive:
+        archive_render(f"{style_name}_{user_id}_{time.time_ns()}{ext}", data)
+    return data, ext
+
+
+def render_fansign(module_path, user_id, text, font, blur_scale=None, archive=False, output=None, version=None):
+    # font, template and text layer lookups happen wherever this runs; a process worker's
+    # counts would never reach the exported gauges, so the job reports what it added
+    before = metrics.cache_counts()
+    ext, data, timings = render_style(module_path, user_id, text, font, blur_scale, archive, output, version)
+    return ext, data, timings, metrics.cache_count_delta(before)
+
+
+def render_style(module_path, user_id, text, font, blur_scale=None, archive=False, output=None, version=None):
+    # runs inside a worker, so style coroutines get their own short-lived loop;
+    # stage timings travel back with the result so process pools report them too
+    timings = {}
+    start = time.perf_counter()
+    # loading a style decodes its template and builds its maps, so it happens here rather than on
+    # the event loop; process workers hold their own registry and pick up edited styles too
+    style_name = module_path.rpartition(".")[2]
+    module = style_registry.get(module_path, version)
+    func_name = find_renderer(module, style_name)
+    if func_name is None:
+        raise MissingRendererError(f"style module missing function `{GENERATE_PREFIX}{style_name}`")
+    result = getattr(module, func_name)(user_id, text, font)
+    if inspect.iscoroutine(result):
+        result = asyncio.run(result)
+    timings["render"] = time.perf_counter() - start
+
+    if isinstance(result, Image.Image):
+        data, ext = render_image(result, style_name, user_id, blur_scale, archive, output, timings)
+        return ext, data, timings
+
+    # legacy styles write to fansign/generated themselves and return the path
+    out_path = Path(result)
+    if blur_scale is None:
+        return out_path.suffix, out_path.read_bytes(), timings
+
+    try:
+        data, ext = blur_and_encode(out_path, blur_scale, output, timings)
+        return ext, data, timings
+    except Exception as img_err:
+        print(f"Warning: could not blur image, sending original. Error: {img_err}")
+        return out_path.suffix, out_path.read_bytes(), timings
+
+
+async def submit(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    metrics.render_queue_depth.inc()
+    try:
+        return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+    finally:
+        metrics.render_queue_depth.dec()
+
+
+async def render_cached(module_path, user_id, text, font, blur_scale=None, command="fansign"):
+    # the file version keeps a hot-reloaded style from serving renders of the old code
+    version = style_registry.version(module_path)
+
+    async def render_job():
+        ext, data, timings, cache_delta = await submit(
+            render_fansign, module_path, user_id, text, font,
+            blur_scale, _archive, dict(postprocess.settings), version
+        )
+        for stage_name, seconds in timings.items():
+            metrics.observe_stage(command, stage_name, seconds)
+        # thread workers already count into this process's caches
+        if _kind == "process":
+            metrics.merge_worker_counts(cache_delta)
+        return ext, data
+
+    key = render_key(module_path, version, text, font, blur_scale)
+    style_registry.record_use(module_path)
+    ext, data = await result_cache.get_or_render(key, render_job)
+    generations.add()
+    # cached bytes are shared between users, the filename is per caller
+    return f"{module_path.rpartition('.')[2]}_{user_id}{ext}", data
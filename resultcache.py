@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def render_key(*parts):
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, ext, data):
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.used_bytes -= len(previous[1])
+        if len(data) > self.max_bytes:
+            return
+        # entries hold user-independent bytes; callers build their own filenames
+        self.entries[key] = (ext, data)
+        self.used_bytes += len(data)
+        while self.used_bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.used_bytes -= len(evicted)
+
+    async def get_or_render(self, key, render):
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        task = self.inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # the render outlives any single caller so one cancellation can't fail the others
+            task = asyncio.ensure_future(render())
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        self.inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        ext, data = task.result()
+        self.put(key, ext, data)
+
+    def clear(self):
+        self.entries.clear()
+        self.used_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.used_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self.inflight),
+        }
@@ -0,0 +1,122 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ROOMS_PATH = BASE_DIR / "private_rooms.json"
+
+
+class RoomExpiryScheduler:
+    def __init__(self, on_expire, path=ROOMS_PATH):
+        self.on_expire = on_expire
+        self.path = Path(path)
+        self.heap = []
+        self.rooms = {}
+        self.owners = {}
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                rooms = json.load(f)
+        except Exception as e:
+            print(f"Failed to load private rooms: {e}")
+            return
+        for room in rooms:
+            self.track(room["guild_id"], room["channel_id"], room["owner_id"], room["deadline"])
+
+    def save(self, rooms):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(rooms, f)
+        os.replace(tmp_path, self.path)
+
+    async def persist(self):
+        rooms = [{"channel_id": channel_id, **room} for channel_id, room in self.rooms.items()]
+        try:
+            await asyncio.to_thread(self.save, rooms)
+        except Exception as e:
+            print(f"Failed to save private rooms: {e}")
+
+    def track(self, guild_id, channel_id, owner_id, deadline):
+        previous = self.rooms.get(channel_id)
+        if previous is not None:
+            self.owners.get(previous["guild_id"], {}).pop(previous["owner_id"], None)
+        self.rooms[channel_id] = {"guild_id": guild_id, "owner_id": owner_id, "deadline": deadline}
+        self.owners.setdefault(guild_id, {})[owner_id] = channel_id
+        heapq.heappush(self.heap, (deadline, channel_id))
+        if self.heap[0][1] == channel_id:
+            self.wakeup.set()
+
+    def untrack(self, channel_id):
+        room = self.rooms.pop(channel_id, None)
+        if room is None:
+            return None
+        owners = self.owners.get(room["guild_id"], {})
+        if owners.get(room["owner_id"]) == channel_id:
+            del owners[room["owner_id"]]
+        return room
+
+    async def schedule(self, guild_id, channel_id, owner_id, deadline):
+        self.track(guild_id, channel_id, owner_id, deadline)
+        await self.persist()
+
+    async def forget(self, channel_id):
+        if self.untrack(channel_id) is not None:
+            await self.persist()
+
+    def room_for(self, guild_id, owner_id):
+        return self.owners.get(guild_id, {}).get(owner_id)
+
+    def is_tracked(self, channel_id):
+        return channel_id in self.rooms
+
+    def pop_stale(self):
+        # entries superseded by a reschedule or removed via untrack are skipped lazily
+        while self.heap:
+            deadline, channel_id = self.heap[0]
+            room = self.rooms.get(channel_id)
+            if room is not None and room["deadline"] == deadline:
+                return
+            heapq.heappop(self.heap)
+
+    async def run(self):
+        while True:
+            self.pop_stale()
+            self.wakeup.clear()
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+
+            deadline, channel_id = self.heap[0]
+            delay = deadline - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self.heap)
+            room = self.untrack(channel_id)
+            await self.persist()
+            try:
+                await self.on_expire(channel_id, room)
+            except Exception as e:
+                print(f"Failed to expire private room {channel_id}: {e}")
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return self.task
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
@@ -1,43 +1,29 @@
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
-from pathlib import Path
 from discord import File
-from io import StringIO
-import string
-import random
+import io
+import zipfile
+from commands import metrics
+from commands.keystore import generate_keys, get_keystore
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-KEYS_FILE = BASE_DIR / "keys.txt"
+KEY_BATCH_SIZE = 10000
+COMPRESS_THRESHOLD = 1000
 
-def generate_key(length=20):
-    allowed_chars = string.ascii_letters + string.digits + "!$?"
-    return ''.join(random.choices(allowed_chars, k=length))
+def build_key_file(keys):
+    key_list = "\n".join(keys).encode()
+    if len(keys) < COMPRESS_THRESHOLD:
+        return File(fp=io.BytesIO(key_list), filename="premium_keys.txt")
 
-def load_keys():
-    keys = {}
-    if not KEYS_FILE.exists():
-        return keys
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("premium_keys.txt", key_list)
+    buffer.seek(0)
+    return File(fp=buffer, filename="premium_keys.zip")
 
-    with open(KEYS_FILE, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if ':' in line:
-                key, user_id = line.split(':', 1)
-                keys[key] = user_id
-            else:
-                keys[line] = None
-    return keys
-
-def save_keys(keys: dict):
-    with open(KEYS_FILE, 'w') as f:
-        for key, user_id in keys.items():
-            if user_id:
-                f.write(f"{key}:{user_id}\n")
-            else:
-                f.write(f"{key}\n")
+def generate_batch(keystore, count):
+    return keystore.insert_new_keys(generate_keys(count))
 
 class BulkGenKeys(commands.Cog):
     def __init__(self, bot):
@@ -45,6 +31,7 @@ class BulkGenKeys(commands.Cog):
 
     @app_commands.command(name="genkeys", description="Generate premium keys and get them in DMs. (Owner only)")
     @app_commands.describe(amount="Number of keys to generate")
+    @metrics.instrument("genkeys")
     async def genkeys(self, interaction: discord.Interaction, amount: int):
         owner_id = 110332657337913344
         if interaction.user.id != owner_id:
@@ -55,28 +42,30 @@ class BulkGenKeys(commands.Cog):
             await interaction.response.send_message("You can generate between 1 and 100,000 keys at a time.", ephemeral=True)
             return
 
-        existing_keys = load_keys()
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        keystore = get_keystore()
         new_keys = []
 
         while len(new_keys) < amount:
-            key = generate_key()
-            if key not in existing_keys:
-                new_keys.append(key)
-                existing_keys[key] = None
-
-        save_keys(existing_keys)
+            count = min(KEY_BATCH_SIZE, amount - len(new_keys))
+            new_keys.extend(await asyncio.to_thread(generate_batch, keystore, count))
+            if len(new_keys) < amount:
+                await interaction.edit_original_response(
+                    content=f"Generating keys... {len(new_keys):,}/{amount:,}"
+                )
 
-        key_list = "\n".join(new_keys)
-        file = File(fp=StringIO(key_list), filename="premium_keys.txt")
+        file = await asyncio.to_thread(build_key_file, new_keys)
 
         try:
             await interaction.user.send(
                 content=f"Here are your {amount} premium key(s):",
                 file=file
             )
-            await interaction.response.send_message("Keys generated and sent to your DMs.", ephemeral=True)
+            await interaction.edit_original_response(content="Keys generated and sent to your DMs.")
         except discord.Forbidden:
-            await interaction.response.send_message("Failed to send DM. Please enable DMs from server members.", ephemeral=True)
+            metrics.mark_error()
+            await interaction.edit_original_response(content="Failed to send DM. Please enable DMs from server members.")
 
 async def setup(bot):
     await bot.add_cog(BulkGenKeys(bot))
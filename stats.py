@@ -0,0 +1,63 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from commands import metrics
+
+OWNER_ID = 110332657337913344
+
+def format_seconds(value):
+    if value is None:
+        return "-"
+    if value < 1:
+        return f"{value * 1000:.0f}ms"
+    return f"{value:.2f}s"
+
+class Stats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def command_lines(self):
+        lines = []
+        for (command,) in sorted(metrics.command_seconds.values):
+            count, _ = metrics.command_seconds.summary(command)
+            errors = metrics.commands_total.values.get((command, "error"), 0)
+            p50 = metrics.command_seconds.quantile(0.5, command)
+            p95 = metrics.command_seconds.quantile(0.95, command)
+            lines.append(f"`/{command}` {count} runs, {errors} errors, p50 {format_seconds(p50)}, p95 {format_seconds(p95)}")
+        return lines or ["no commands recorded yet"]
+
+    def stage_lines(self):
+        lines = []
+        for command, stage in sorted(metrics.stage_seconds.values):
+            p50 = metrics.stage_seconds.quantile(0.5, command, stage)
+            p95 = metrics.stage_seconds.quantile(0.95, command, stage)
+            lines.append(f"`{command}.{stage}` p50 {format_seconds(p50)}, p95 {format_seconds(p95)}")
+        return lines or ["no stages recorded yet"]
+
+    def cache_lines(self):
+        lines = []
+        for name, metric in metrics.registry.metrics.items():
+            if not name.endswith("_cache"):
+                continue
+            fields = {values[0]: value for _, _, values, value in metric.samples()}
+            lookups = fields.get("hits", 0) + fields.get("misses", 0)
+            rate = f"{fields.get('hits', 0) / lookups:.0%}" if lookups else "-"
+            lines.append(f"`{name.removeprefix('esigns_')}` hit rate {rate} ({lookups} lookups)")
+        return lines or ["no caches registered"]
+
+    @app_commands.command(name="stats", description="Show bot performance stats. (Owner only)")
+    @metrics.instrument("stats")
+    async def stats(self, interaction: discord.Interaction):
+        if interaction.user.id != OWNER_ID:
+            await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="Bot stats", color=discord.Color.blue())
+        embed.add_field(name="Commands", value="\n".join(self.command_lines())[:1024], inline=False)
+        embed.add_field(name="Stages", value="\n".join(self.stage_lines())[:1024], inline=False)
+        embed.add_field(name="Caches", value="\n".join(self.cache_lines())[:1024], inline=False)
+        embed.add_field(name="Render queue", value=str(metrics.render_queue_depth.values.get((), 0)), inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Stats(bot))
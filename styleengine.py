@@ -0,0 +1,197 @@
+import json
+import types
+from pathlib import Path
+from PIL import Image, ImageColor, ImageFilter
+from commands import effects, fontcache, templates, textlayers, transforms
+
+RENDER_PREFIX = "render_fansign_"
+GENERATE_PREFIX = "generate_fansign_"
+SPEC_SUFFIX = ".json"
+
+ALIGNMENTS = {"left", "center", "right"}
+
+DEFAULT_SPEC = {
+    "font_size": 64,
+    "min_font_size": 12,
+    "color": "#000000",
+    "stroke_width": 0,
+    "stroke_color": "#ffffff",
+    "align": "center",
+    "rotation": 0.0,
+    "perspective": None,
+    "mask": None,
+    "lighting": None,
+    "lighting_radius": transforms.DEFAULT_LIGHTING_RADIUS,
+    "effects": [],
+}
+REQUIRED_FIELDS = {"template", "text_box"}
+
+EFFECTS = {}
+
+
+def effect(name):
+    def decorator(func):
+        EFFECTS[name] = func
+        return func
+    return decorator
+
+
+@effect("blur")
+def blur_effect(layer, radius=1.0):
+    return layer.filter(ImageFilter.GaussianBlur(radius))
+
+
+@effect("opacity")
+def opacity_effect(layer, value=1.0):
+    layer.putalpha(layer.getchannel("A").point(lambda a: round(a * value)))
+    return layer
+
+
+@effect("shadow")
+def shadow_effect(layer, offset=(2, 2), color="#00000080", radius=2.0):
+    rgba = ImageColor.getcolor(color, "RGBA")
+    shadow = Image.new("RGBA", layer.size, rgba[:3] + (0,))
+    shadow.putalpha(layer.getchannel("A").point(lambda a: a * rgba[3] // 255))
+    shadow = shadow.filter(ImageFilter.GaussianBlur(radius))
+    out = Image.new("RGBA", layer.size)
+    out.alpha_composite(shadow, tuple(offset))
+    out.alpha_composite(layer)
+    return out
+
+
+effect("ink_bleed")(effects.ink_bleed)
+effect("noise")(effects.noise)
+effect("color_grade")(effects.color_grade)
+
+
+class StyleSpec:
+    def __init__(self, name, data, base_dir):
+        missing = REQUIRED_FIELDS - set(data)
+        if missing:
+            raise ValueError(f"style '{name}' is missing {', '.join(sorted(missing))}")
+        unknown = set(data) - REQUIRED_FIELDS - set(DEFAULT_SPEC)
+        if unknown:
+            raise ValueError(f"style '{name}' has unknown fields: {', '.join(sorted(unknown))}")
+        merged = {**DEFAULT_SPEC, **data}
+
+        self.name = name
+        self.template_path = Path(base_dir) / merged["template"]
+        self.text_box = tuple(int(v) for v in merged["text_box"])
+        if len(self.text_box) != 4 or self.text_box[2] <= 0 or self.text_box[3] <= 0:
+            raise ValueError(f"style '{name}' text_box must be [x, y, width, height]")
+        self.font_size = int(merged["font_size"])
+        self.min_font_size = int(merged["min_font_size"])
+        self.color = ImageColor.getcolor(merged["color"], "RGBA")
+        self.stroke_width = int(merged["stroke_width"])
+        self.stroke_color = ImageColor.getcolor(merged["stroke_color"], "RGBA")
+        if merged["align"] not in ALIGNMENTS:
+            raise ValueError(f"style '{name}' has unknown align: {merged['align']}")
+        self.align = merged["align"]
+        self.rotation = float(merged["rotation"])
+
+        self.effects = []
+        for entry in merged["effects"]:
+            params = dict(entry)
+            kind = params.pop("type", None)
+            if kind not in EFFECTS:
+                raise ValueError(f"style '{name}' has unknown effect: {kind}")
+            self.effects.append((EFFECTS[kind], params))
+
+        # geometry, clipping and lighting depend only on the spec, so they are worked out once per load
+        self.transform = transforms.build_style_transform(
+            name, base_dir, self.template_path, self.text_box,
+            corners=merged["perspective"],
+            rotation=self.rotation,
+            mask=merged["mask"],
+            lighting=merged["lighting"],
+            lighting_radius=float(merged["lighting_radius"])
+        )
+
+    def fit_size(self, font_name, text):
+        width, height = self.text_box[2], self.text_box[3]
+        size = self.font_size
+        while True:
+            font = fontcache.get_font(font_name, size)
+            left, top, right, bottom = font.getbbox(text, stroke_width=self.stroke_width)
+            if (right - left <= width and bottom - top <= height) or size <= self.min_font_size:
+                return size
+            size = max(self.min_font_size, size - 2)
+
+    def text_layer(self, text, font_name):
+        size = self.fit_size(font_name, text)
+        return textlayers.get_layer(text, font_name, size, self.color, self.stroke_width, self.stroke_color)
+
+    def align_layer(self, layer):
+        width, height = self.text_box[2], self.text_box[3]
+        if self.align == "left":
+            x = 0
+        elif self.align == "right":
+            x = width - layer.size[0]
+        else:
+            x = (width - layer.size[0]) // 2
+        return x, (height - layer.size[1]) // 2
+
+    def render_text(self, text, font_name):
+        layer = self.text_layer(text, font_name)
+        box = Image.new("RGBA", self.text_box[2:])
+        box.paste(layer.image, self.align_layer(layer))
+        return box
+
+    def render(self, text, font_name):
+        img = templates.get_template(self.template_path, "RGBA")
+        if not self.effects and self.transform.identity:
+            # plain placement: the shared glyph layer goes straight onto the template
+            layer = self.text_layer(text, font_name)
+            x, y = self.align_layer(layer)
+            composite(img, layer.image, x + self.text_box[0], y + self.text_box[1])
+            return img
+
+        layer = self.render_text(text, font_name)
+        for func, params in self.effects:
+            layer = func(layer, **params)
+        layer, (x, y) = self.transform.apply(layer)
+        composite(img, layer, x, y)
+        return img
+
+
+def composite(img, layer, x, y):
+    # layers that start above or left of the template are cropped rather than rejected
+    img.alpha_composite(layer, dest=(max(0, x), max(0, y)), source=(max(0, -x), max(0, -y)))
+
+
+def load_spec(path, name=None):
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return StyleSpec(name or path.stem, data, path.parent)
+
+
+def spec_renderer(spec):
+    def render(user_id, text, font):
+        return spec.render(text, font)
+    return render
+
+
+def spec_module(module_path, path):
+    # a .json style becomes a module exposing render_fansign_<style>, so the registry,
+    # render workers and caches treat it exactly like a hand-written style
+    style_name = module_path.rpartition(".")[2]
+    spec = load_spec(path, style_name)
+    module = types.ModuleType(module_path)
+    module.__file__ = str(path)
+    module.STYLE_SPEC = spec
+    setattr(module, f"{RENDER_PREFIX}{style_name}", spec_renderer(spec))
+    return module
+
+
+def adapt_module(module, module_path):
+    # hand-written modules can declare STYLE_SPEC instead of a renderer and still get the engine
+    style_name = module_path.rpartition(".")[2]
+    data = getattr(module, "STYLE_SPEC", None)
+    if not isinstance(data, dict):
+        return module
+    if hasattr(module, f"{RENDER_PREFIX}{style_name}") or hasattr(module, f"{GENERATE_PREFIX}{style_name}"):
+        return module
+    spec = StyleSpec(style_name, data, Path(module.__file__).parent)
+    setattr(module, f"{RENDER_PREFIX}{style_name}", spec_renderer(spec))
+    return module
@@ -0,0 +1,159 @@
+import asyncio
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from commands import styleengine
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+USAGE_PATH = BASE_DIR / "style_usage.json"
+
+CHECK_INTERVAL = 2.0
+USAGE_SAVE_INTERVAL = 300
+DEFAULT_PREFETCH = 10
+
+
+class StyleEntry:
+    __slots__ = ("module", "mtime_ns", "checked_at")
+
+    def __init__(self, module, mtime_ns, checked_at):
+        self.module = module
+        self.mtime_ns = mtime_ns
+        self.checked_at = checked_at
+
+
+def module_file(module_path):
+    path = BASE_DIR.joinpath(*module_path.split(".")).with_suffix(".py")
+    if not path.exists():
+        spec_path = path.with_suffix(styleengine.SPEC_SUFFIX)
+        if spec_path.exists():
+            return spec_path
+    return path
+
+
+def load_fresh(module_path, path):
+    # a brand-new module object: renders still holding the old one keep running unchanged
+    package = module_path.rpartition(".")[0]
+    importlib.import_module(package)
+    if path.suffix == styleengine.SPEC_SUFFIX:
+        return styleengine.spec_module(module_path, path)
+    spec = importlib.util.spec_from_file_location(module_path, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return styleengine.adapt_module(module, module_path)
+
+
+def load_first(module_path, path):
+    module = sys.modules.get(module_path)
+    if module is None:
+        if path.suffix == styleengine.SPEC_SUFFIX:
+            return load_fresh(module_path, path)
+        module = importlib.import_module(module_path)
+    return styleengine.adapt_module(module, module_path)
+
+
+class StyleRegistry:
+    def __init__(self, check_interval=CHECK_INTERVAL, usage_path=USAGE_PATH):
+        self.check_interval = check_interval
+        self.usage_path = Path(usage_path)
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.usage = Counter()
+
+    def get(self, module_path, version=None):
+        # a caller that already saw a newer file version skips the throttle
+        entry = self.entries.get(module_path)
+        now = time.monotonic()
+        if entry is not None and version in (None, entry.mtime_ns) and now - entry.checked_at < self.check_interval:
+            return entry.module
+
+        with self.lock:
+            entry = self.entries.get(module_path)
+            path = module_file(module_path)
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = None
+
+            if entry is not None and entry.mtime_ns == mtime_ns:
+                entry.checked_at = now
+                return entry.module
+
+            if entry is None:
+                module = load_first(module_path, path)
+            else:
+                try:
+                    module = load_fresh(module_path, path)
+                except Exception as e:
+                    print(f"Failed to reload style '{module_path}', keeping the loaded version: {e}")
+                    # don't retry the same broken file on every render
+                    entry.mtime_ns = mtime_ns
+                    entry.checked_at = now
+                    return entry.module
+                print(f"Reloaded style '{module_path}'.")
+
+            sys.modules[module_path] = module
+            self.entries[module_path] = StyleEntry(module, mtime_ns, now)
+            return module
+
+    def version(self, module_path):
+        # a stat, not a load, so the event loop can key caches by it
+        try:
+            return os.stat(module_file(module_path)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def font_sizes(self):
+        # hand-written renderers pick their sizes in code, so only spec-driven styles are known here
+        sizes = set()
+        for entry in list(self.entries.values()):
+            spec = getattr(entry.module, "STYLE_SPEC", None)
+            if isinstance(spec, styleengine.StyleSpec):
+                sizes.add(spec.font_size)
+            elif isinstance(spec, dict):
+                sizes.add(int(spec.get("font_size", styleengine.DEFAULT_SPEC["font_size"])))
+        return sizes
+
+    def record_use(self, module_path):
+        self.usage[module_path] += 1
+
+    def load_usage(self):
+        if not self.usage_path.exists():
+            return
+        try:
+            with open(self.usage_path) as f:
+                self.usage.update(json.load(f))
+        except Exception as e:
+            print(f"Failed to load style usage: {e}")
+
+    def save_usage(self):
+        tmp_path = self.usage_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(dict(self.usage), f)
+        os.replace(tmp_path, self.usage_path)
+
+    def prefetch(self, limit=DEFAULT_PREFETCH):
+        self.load_usage()
+        for module_path, _ in self.usage.most_common(limit):
+            if not module_file(module_path).exists():
+                continue
+            try:
+                self.get(module_path)
+            except Exception as e:
+                print(f"Failed to prefetch style '{module_path}': {e}")
+
+    async def persist_usage(self, interval=USAGE_SAVE_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.save_usage)
+            except Exception as e:
+                print(f"Failed to save style usage: {e}")
+
+
+style_registry = StyleRegistry()
@@ -0,0 +1,96 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from PIL import Image
+from commands import metrics
+
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+
+_lock = threading.Lock()
+_templates = OrderedDict()
+_budget_bytes = DEFAULT_BUDGET_BYTES
+_used_bytes = 0
+_hits = 0
+_misses = 0
+_evictions = 0
+
+
+def configure(budget_bytes=DEFAULT_BUDGET_BYTES):
+    global _budget_bytes
+    with _lock:
+        _budget_bytes = budget_bytes
+        _evict()
+
+
+def image_nbytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+def _evict():
+    global _used_bytes, _evictions
+    while _templates and _used_bytes > _budget_bytes:
+        _, (_, img) = _templates.popitem(last=False)
+        _used_bytes -= image_nbytes(img)
+        _evictions += 1
+
+
+def load_template(path, mode="RGBA"):
+    with Image.open(path) as img:
+        img.load()
+        if img.mode != mode:
+            return img.convert(mode)
+        return img.copy()
+
+
+def get_template(path, mode="RGBA", copy=True):
+    # copy=False hands out the shared image; callers must treat it as read-only
+    global _used_bytes, _hits, _misses
+    path = Path(path).resolve()
+    mtime_ns = os.stat(path).st_mtime_ns
+    cache_key = (path, mode)
+
+    with _lock:
+        entry = _templates.get(cache_key)
+        if entry is not None and entry[0] == mtime_ns:
+            _templates.move_to_end(cache_key)
+            _hits += 1
+            img = entry[1]
+            return img.copy() if copy else img
+        _misses += 1
+
+    img = load_template(path, mode)
+    nbytes = image_nbytes(img)
+
+    with _lock:
+        previous = _templates.pop(cache_key, None)
+        if previous is not None:
+            _used_bytes -= image_nbytes(previous[1])
+        if nbytes <= _budget_bytes:
+            _templates[cache_key] = (mtime_ns, img)
+            _used_bytes += nbytes
+            _evict()
+
+    return img.copy() if copy else img
+
+
+def clear():
+    global _used_bytes
+    with _lock:
+        _templates.clear()
+        _used_bytes = 0
+
+
+def stats():
+    with _lock:
+        return {
+            "entries": len(_templates),
+            "bytes": _used_bytes,
+            "budget_bytes": _budget_bytes,
+            "hits": _hits,
+            "misses": _misses,
+            "evictions": _evictions,
+        }
+
+
+metrics.cache_gauge("esigns_template_cache", "Template cache statistics.", stats)
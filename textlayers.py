@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageColor, ImageDraw
+from commands import fontcache, metrics
+
+MAX_LAYERS = 1024
+
+_lock = threading.Lock()
+_layers = OrderedDict()
+_inflight = {}
+_hits = 0
+_misses = 0
+
+
+class TextLayer:
+    __slots__ = ("image", "offset")
+
+    def __init__(self, image, offset):
+        # image is shared between renders and must be treated as read-only;
+        # offset is where its top-left sits relative to the text origin
+        self.image = image
+        self.offset = offset
+
+    @property
+    def size(self):
+        return self.image.size
+
+
+def normalize_color(color):
+    if color is None:
+        return None
+    if isinstance(color, str):
+        return ImageColor.getcolor(color, "RGBA")
+    return tuple(color) if len(color) == 4 else tuple(color) + (255,)
+
+
+def rasterize(text, font_name, size, color, stroke_width, stroke_color):
+    font = fontcache.get_font(font_name, size)
+    left, top, right, bottom = font.getbbox(text, stroke_width=stroke_width)
+    image = Image.new("RGBA", (max(1, right - left), max(1, bottom - top)))
+    ImageDraw.Draw(image).text(
+        (-left, -top), text, font=font, fill=color,
+        stroke_width=stroke_width, stroke_fill=stroke_color
+    )
+    return TextLayer(image, (left, top))
+
+
+def get_layer(text, font_name, size, color=(0, 0, 0, 255), stroke_width=0, stroke_color=None):
+    global _hits, _misses
+    color = normalize_color(color)
+    stroke_color = normalize_color(stroke_color)
+    cache_key = (text, font_name, size, color, stroke_width, stroke_color)
+
+    while True:
+        with _lock:
+            layer = _layers.get(cache_key)
+            if layer is not None:
+                _layers.move_to_end(cache_key)
+                _hits += 1
+                return layer
+            # styles of one bulkgen run ask for the same layer at once; only one rasterizes it
+            pending = _inflight.get(cache_key)
+            if pending is None:
+                _misses += 1
+                pending = _inflight[cache_key] = threading.Event()
+                break
+        # if the rasterizing thread fails, the next pass takes over
+        pending.wait()
+
+    try:
+        layer = rasterize(text, font_name, size, color, stroke_width, stroke_color)
+        with _lock:
+            _layers[cache_key] = layer
+            while len(_layers) > MAX_LAYERS:
+                _layers.popitem(last=False)
+        return layer
+    finally:
+        with _lock:
+            _inflight.pop(cache_key, None)
+        pending.set()
+
+
+def clear():
+    with _lock:
+        _layers.clear()
+
+
+def stats():
+    with _lock:
+        return {"entries": len(_layers), "hits": _hits, "misses": _misses}
+
+
+metrics.cache_gauge("esigns_text_layer_cache", "Text layer cache statistics.", stats)
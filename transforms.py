@@ -0,0 +1,175 @@
+import functools
+import hashlib
+import math
+import os
+from pathlib import Path
+from PIL import Image, ImageChops, ImageFilter
+from commands import templates
+
+CACHE_DIR_NAME = "__transforms__"
+DEFAULT_LIGHTING_RADIUS = 25.0
+
+_cache_to_disk = True
+
+
+def configure(cache_to_disk=True):
+    global _cache_to_disk
+    _cache_to_disk = cache_to_disk
+
+
+def solve_linear(matrix, vector):
+    # gaussian elimination with partial pivoting; only used for the 8x8 perspective system
+    n = len(vector)
+    rows = [list(row) + [value] for row, value in zip(matrix, vector)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            raise ValueError("perspective corners are degenerate")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(n):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] for i in range(n)]
+
+
+def perspective_coefficients(dst, src):
+    # Image.transform maps output pixels back to input pixels, so solve dst -> src
+    matrix = []
+    vector = []
+    for (x, y), (u, v) in zip(dst, src):
+        matrix.append([x, y, 1, 0, 0, 0, -u * x, -u * y])
+        matrix.append([0, 0, 0, x, y, 1, -v * x, -v * y])
+        vector.extend((u, v))
+    return solve_linear(matrix, vector)
+
+
+class Warp:
+    def __init__(self, corners, src_size):
+        if len(corners) != 4:
+            raise ValueError("perspective needs four corners")
+        left = math.floor(min(x for x, _ in corners))
+        top = math.floor(min(y for _, y in corners))
+        right = math.ceil(max(x for x, _ in corners))
+        bottom = math.ceil(max(y for _, y in corners))
+        width, height = src_size
+        dst = [(x - left, y - top) for x, y in corners]
+        src = [(0, 0), (width, 0), (width, height), (0, height)]
+        self.offset = (left, top)
+        self.size = (right - left, bottom - top)
+        self.coefficients = perspective_coefficients(dst, src)
+
+    def apply(self, layer):
+        return layer.transform(self.size, Image.Transform.PERSPECTIVE, self.coefficients, Image.Resampling.BICUBIC)
+
+
+@functools.lru_cache(maxsize=256)
+def perspective(corners, src_size):
+    # corners: ((x, y),) * 4 in template pixels for the layer's tl, tr, br, bl
+    return Warp(corners, src_size)
+
+
+def rotated_size(size, angle):
+    # the same bounds Image.rotate(expand=True) produces, without rotating anything
+    return Image.new("L", size).rotate(angle, expand=True).size
+
+
+def crop_region(img, offset, size):
+    # regions may hang off the template; the outside reads as black
+    x, y = offset
+    return img.crop((x, y, x + size[0], y + size[1]))
+
+
+def load_mask(path, offset, size):
+    with Image.open(path) as img:
+        return crop_region(img.convert("L"), offset, size)
+
+
+def build_lighting(template_path, offset, size, radius):
+    template = templates.get_template(template_path, "L", copy=False)
+    gray = crop_region(template, offset, size).filter(ImageFilter.GaussianBlur(radius))
+    brightest = gray.getextrema()[1] or 255
+    # brightest paper keeps the ink color, shaded paper darkens it
+    return gray.point(lambda v: min(255, v * 255 // brightest)).convert("RGB")
+
+
+def cached_map(cache_dir, name, params, build):
+    if not _cache_to_disk:
+        return build()
+    digest = hashlib.sha256(repr(params).encode()).hexdigest()[:16]
+    path = Path(cache_dir) / CACHE_DIR_NAME / f"{name}.{digest}.png"
+    if path.exists():
+        try:
+            with Image.open(path) as img:
+                img.load()
+                return img.copy()
+        except Exception as e:
+            print(f"Ignoring unreadable transform cache {path.name}: {e}")
+
+    img = build()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # process workers may build the same map at once, so write atomically
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        img.save(tmp_path, format="PNG")
+        os.replace(tmp_path, path)
+        for stale in path.parent.glob(f"{name}.*.png"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+    except Exception as e:
+        print(f"Warning: could not cache transform {path.name}: {e}")
+    return img
+
+
+class StyleTransform:
+    def __init__(self, box, warp=None, rotation=0.0, mask=None, lighting=None):
+        x, y, width, height = box
+        self.warp = warp
+        self.rotation = rotation
+        if warp is not None:
+            self.offset, self.size = warp.offset, warp.size
+        elif rotation:
+            self.size = rotated_size((width, height), rotation)
+            self.offset = (x + (width - self.size[0]) // 2, y + (height - self.size[1]) // 2)
+        else:
+            self.offset, self.size = (x, y), (width, height)
+        self.mask = mask
+        self.lighting = lighting
+
+    @property
+    def identity(self):
+        return self.warp is None and not self.rotation and self.mask is None and self.lighting is None
+
+    def apply(self, layer):
+        if self.warp is not None:
+            layer = self.warp.apply(layer)
+        elif self.rotation:
+            layer = layer.rotate(self.rotation, Image.Resampling.BICUBIC, expand=True)
+
+        if self.lighting is not None:
+            alpha = layer.getchannel("A")
+            layer = ImageChops.multiply(layer.convert("RGB"), self.lighting).convert("RGBA")
+            layer.putalpha(alpha)
+        if self.mask is not None:
+            layer.putalpha(ImageChops.multiply(layer.getchannel("A"), self.mask))
+        return layer, self.offset
+
+
+def build_style_transform(name, base_dir, template_path, box, corners=None, rotation=0.0,
+                          mask=None, lighting=None, lighting_radius=DEFAULT_LIGHTING_RADIUS):
+    warp = None
+    if corners is not None:
+        warp = perspective(tuple(tuple(float(v) for v in corner) for corner in corners), tuple(box[2:]))
+    transform = StyleTransform(box, warp, rotation)
+
+    if mask is not None:
+        transform.mask = load_mask(Path(base_dir) / mask, transform.offset, transform.size)
+
+    if lighting is not None:
+        source = Path(template_path) if lighting == "auto" else Path(base_dir) / lighting
+        params = (str(source), source.stat().st_mtime_ns, transform.offset, transform.size, lighting_radius)
+        transform.lighting = cached_map(
+            base_dir, f"{name}.lighting", params,
+            lambda: build_lighting(source, transform.offset, transform.size, lighting_radius)
+        )
+    return transform